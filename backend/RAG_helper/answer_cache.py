@@ -0,0 +1,125 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from backend import config
+from backend.RAG_helper.collection_version import get_collection_version
+from backend.utils.metrics import metrics
+
+
+def fingerprint_documents(docs: list) -> str:
+    """Stable fingerprint of a retrieved chunk set (order independent)."""
+    ids = sorted(
+        doc.id or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+        for doc in docs
+    )
+    return hashlib.sha1("|".join(ids).encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache in front of the LLM.
+    A lookup hits when a stored question has the same intent, was answered from
+    the same retrieved chunks (fingerprint) and its query embedding is at least
+    `similarity` cosine-close to the new one. Entries expire after `ttl_seconds`,
+    the least recently used entry is evicted past `max_entries`, and everything
+    is dropped when the vector DB version changes.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = config.ANSWER_CACHE_MAX_ENTRIES,
+            ttl_seconds: float = config.ANSWER_CACHE_TTL_SECONDS,
+            similarity: float = config.ANSWER_CACHE_SIMILARITY,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._entries = OrderedDict()  # entry id -> entry dict, LRU order
+        self._buckets = {}  # (intent, fingerprint) -> set of entry ids
+        self._next_id = 0
+        self._version = get_collection_version()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-12)
+
+    def _check_version(self):
+        version = get_collection_version()
+        if version != self._version:
+            self._entries.clear()
+            self._buckets.clear()
+            self._version = version
+            metrics.incr("answer_cache_invalidations_total")
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        bucket = self._buckets[entry["bucket"]]
+        bucket.discard(entry_id)
+        if not bucket:
+            del self._buckets[entry["bucket"]]
+
+    def lookup(self, vector, intent: str, fingerprint: str) -> dict | None:
+        """
+        :param vector: query embedding
+        :param intent: detected intent
+        :param fingerprint: fingerprint_documents() of the retrieved chunks
+        :return: the cached entry ({"answer", "sources", ...}) or None
+        """
+        query = self._normalize(vector)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version()
+            best_id, best_score = None, self.similarity
+            for entry_id in list(self._buckets.get((intent, fingerprint), ())):
+                entry = self._entries[entry_id]
+                if now - entry["created"] > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+                score = float(entry["vector"] @ query)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                metrics.incr("answer_cache_total", result="miss")
+                return None
+            self._entries.move_to_end(best_id)
+            metrics.incr("answer_cache_total", result="hit")
+            return self._entries[best_id]
+
+    def store(self, vector, intent: str, fingerprint: str, answer: str, sources: list = None):
+        """Cache an answer, evicting the least recently used entry when full."""
+        bucket = (intent, fingerprint)
+        with self._lock:
+            self._check_version()
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "vector": self._normalize(vector),
+                "bucket": bucket,
+                "answer": answer,
+                "sources": sources or [],
+                "created": time.monotonic(),
+            }
+            self._buckets.setdefault(bucket, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                metrics.incr("answer_cache_evictions_total")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        hits = metrics.counter("answer_cache_total", result="hit")
+        misses = metrics.counter("answer_cache_total", result="miss")
+        return {
+            "entries": len(self._entries),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+        }
@@ -0,0 +1,21 @@
+import time
+import uuid
+from backend import config
+
+
+def get_collection_version() -> str:
+    """
+    Token that changes every time the vector DB is rebuilt.
+    Caches built on top of the collection compare it to detect stale entries.
+    """
+    try:
+        return config.db_version_file.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return ""
+
+
+def bump_collection_version() -> str:
+    """Write a new collection version token next to the vector DB."""
+    version = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    config.db_version_file.write_text(version, encoding="utf-8")
+    return version
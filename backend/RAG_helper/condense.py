@@ -0,0 +1,92 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from backend import config
+from backend.utils.metrics import metrics
+from langchain.chains import LLMChain
+from langchain.chains.base import Chain
+from langchain.chains.conversational_retrieval.prompts import CONDENSE_QUESTION_PROMPT
+from langchain_core.callbacks import AsyncCallbackManagerForChainRun, CallbackManagerForChainRun
+from pydantic import PrivateAttr
+
+
+def is_standalone(question: str) -> bool:
+    """
+    Heuristic: a question that is long enough and has no words pointing back at
+    the conversation (it, they, that one, ...) can be retrieved for as is.
+    """
+    words = re.findall(r"[a-z']+", question.lower())
+    if len(words) < config.CONDENSE_MIN_WORDS:
+        return False
+    return not any(word in config.CONDENSE_REFERRING_WORDS for word in words)
+
+
+class CondenseQuestionChain(Chain):
+    """
+    Drop-in question_generator for ConversationalRetrievalChain.
+    Standalone questions are passed through without an LLM call, and rewrites
+    are memoized per (chat history digest, question).
+    """
+
+    llm_chain: LLMChain
+    max_entries: int = config.CONDENSE_MEMO_SIZE
+    _memo: Any = PrivateAttr(default_factory=OrderedDict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @classmethod
+    def from_llm(cls, llm, **kwargs) -> "CondenseQuestionChain":
+        return cls(llm_chain=LLMChain(llm=llm, prompt=CONDENSE_QUESTION_PROMPT), **kwargs)
+
+    @property
+    def input_keys(self) -> list[str]:
+        return ["question", "chat_history"]
+
+    @property
+    def output_keys(self) -> list[str]:
+        return ["text"]
+
+    @staticmethod
+    def _key(inputs: dict) -> tuple:
+        digest = hashlib.sha1(str(inputs["chat_history"]).encode("utf-8")).hexdigest()
+        return digest, inputs["question"]
+
+    def _lookup(self, inputs: dict) -> Optional[str]:
+        if is_standalone(inputs["question"]):
+            metrics.incr("condense_total", result="standalone")
+            return inputs["question"]
+        with self._lock:
+            key = self._key(inputs)
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                metrics.incr("condense_total", result="memo")
+                return self._memo[key]
+        return None
+
+    def _store(self, inputs: dict, text: str, seconds: float):
+        metrics.incr("condense_total", result="llm")
+        metrics.observe("stage_seconds", seconds, stage="condense")
+        with self._lock:
+            self._memo[self._key(inputs)] = text
+            if len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+
+    def _call(self, inputs: dict, run_manager: Optional[CallbackManagerForChainRun] = None) -> dict:
+        text = self._lookup(inputs)
+        if text is None:
+            start = time.perf_counter()
+            callbacks = run_manager.get_child() if run_manager else None
+            text = self.llm_chain.invoke(inputs, config={"callbacks": callbacks})["text"].strip()
+            self._store(inputs, text, time.perf_counter() - start)
+        return {"text": text}
+
+    async def _acall(self, inputs: dict, run_manager: Optional[AsyncCallbackManagerForChainRun] = None) -> dict:
+        text = self._lookup(inputs)
+        if text is None:
+            start = time.perf_counter()
+            callbacks = run_manager.get_child() if run_manager else None
+            text = (await self.llm_chain.ainvoke(inputs, config={"callbacks": callbacks}))["text"].strip()
+            self._store(inputs, text, time.perf_counter() - start)
+        return {"text": text}
@@ -0,0 +1,135 @@
+import re
+from backend import config
+from backend.utils.metrics import metrics
+from langchain_core.documents import Document
+
+
+def count_tokens(text: str) -> int:
+    """Cheap token estimate (no tokenizer for llama3.2 on the serving path)."""
+    return (len(text) + config.CHARS_PER_TOKEN - 1) // config.CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to about max_tokens, at a word boundary."""
+    max_chars = max_tokens * config.CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    return cut[:cut.rfind(" ")] if " " in cut else cut
+
+
+def _overlap(first: str, second: str) -> int:
+    """Length of the longest suffix of `first` that is a prefix of `second` (at least 20 chars)."""
+    probe = second[:20]
+    if len(probe) < 20:
+        return 0
+    start = first.find(probe, max(0, len(first) - 2 * config.CHUNK_OVERLAP))
+    while start != -1:
+        if second.startswith(first[start:]):
+            return len(first) - start
+        start = first.find(probe, start + 1)
+    return 0
+
+
+def merge_adjacent(docs: list) -> list:
+    """
+    Merge chunks of the same source whose text overlaps (the splitter's chunk_overlap),
+    so the shared text is sent to the LLM once. Rank order of the first chunk is kept.
+    """
+    merged = []
+    for doc in docs:
+        source = doc.metadata.get("source")
+        for i, kept in enumerate(merged):
+            if source is None or kept.metadata.get("source") != source:
+                continue
+            first, second = kept, doc
+            if doc.metadata.get("start_index", 0) < kept.metadata.get("start_index", 0):
+                first, second = doc, kept
+            overlap = _overlap(first.page_content, second.page_content)
+            if overlap:
+                merged[i] = Document(
+                    id=kept.id,
+                    page_content=first.page_content + second.page_content[overlap:],
+                    metadata=first.metadata,
+                )
+                break
+        else:
+            merged.append(doc)
+    return merged
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    return {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+
+def drop_near_duplicates(docs: list, threshold: float = config.CONTEXT_DUPLICATE_THRESHOLD) -> list:
+    """Drop chunks whose word 3-gram Jaccard similarity to a better-ranked chunk is above threshold."""
+    kept, kept_shingles = [], []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(len(shingles & other) / (len(shingles | other) or 1) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+    return kept
+
+
+def fit_documents(docs: list, budget: int = config.CONTEXT_TOKEN_BUDGET) -> list:
+    """Keep chunks in rank order until the token budget is spent; the last one may be cut short."""
+    fitted, used = [], 0
+    for doc in docs:
+        tokens = count_tokens(doc.page_content)
+        if used + tokens <= budget:
+            fitted.append(doc)
+            used += tokens
+            continue
+        remaining = budget - used
+        if remaining >= config.CONTEXT_MIN_PARTIAL_TOKENS:
+            fitted.append(Document(id=doc.id, page_content=truncate_to_tokens(doc.page_content, remaining),
+                                   metadata=doc.metadata))
+        break
+    return fitted
+
+
+def assemble_context(docs: list, budget: int = config.CONTEXT_TOKEN_BUDGET) -> list:
+    """Context stage between retrieval and the prompt: merge overlaps, dedupe, cap tokens."""
+    return fit_documents(drop_near_duplicates(merge_adjacent(docs)), budget)
+
+
+def fit_history(messages: list, budget: int = config.HISTORY_TOKEN_BUDGET) -> list:
+    """
+    Keep the most recent chat messages that fit the budget; older turns are dropped
+    and an over-long message is truncated. A leading system message (the session's
+    rolling summary) is not trimmed with the turns: its tokens are set aside first,
+    capped at half the budget, and the window is fitted into the rest.
+    """
+    summary = []
+    if messages and messages[0].type == "system":
+        text = truncate_to_tokens(messages[0].content, budget // 2)
+        summary = [messages[0].model_copy(update={"content": text})]
+        budget -= count_tokens(text)
+        messages = messages[1:]
+
+    fitted, used = [], 0
+    for message in reversed(messages):
+        tokens = count_tokens(message.content)
+        if used + tokens > budget:
+            remaining = budget - used
+            if remaining >= config.CONTEXT_MIN_PARTIAL_TOKENS and not fitted:
+                fitted.append(message.model_copy(update={"content": truncate_to_tokens(message.content, remaining)}))
+            break
+        fitted.append(message)
+        used += tokens
+    return summary + fitted[::-1]
+
+
+def record_prompt_tokens(question: str, docs: list, messages: list) -> int:
+    """Estimate the answer prompt size of a request and record it."""
+    context = sum(count_tokens(doc.page_content) for doc in docs or [])
+    history = sum(count_tokens(message.content) for message in messages or [])
+    total = count_tokens(question) + context + history + config.PROMPT_TEMPLATE_TOKENS
+    metrics.observe("prompt_tokens", total)
+    metrics.observe("prompt_tokens_part", context, part="context")
+    metrics.observe("prompt_tokens_part", history, part="history")
+    return total
@@ -0,0 +1,122 @@
+import json
+from pathlib import Path
+import numpy as np
+from backend import config
+from backend.RAG_helper.collection_version import get_collection_version
+
+
+def add_vector_sums(sums: dict, vectors, doc_types: list, sign: float = 1.0):
+    """
+    Accumulate L2-normalized vectors per doc_type into `sums` (doc_type -> np.ndarray).
+    :param sign: -1 subtracts, for chunks that are removed from the collection
+    """
+    if vectors is None or len(vectors) == 0:
+        return
+    vectors = np.asarray(vectors, dtype=np.float64)
+    vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+    doc_types = np.array([(t or "").lower() for t in doc_types])
+    for doc_type in set(doc_types):
+        if doc_type:
+            total = sign * vectors[doc_types == doc_type].sum(axis=0)
+            sums[doc_type] = sums[doc_type] + total if doc_type in sums else total
+
+
+def _relative_source(source: str) -> str:
+    """Chunk "source" metadata as a path relative to the document root, like the manifest keys."""
+    try:
+        return Path(source).resolve().relative_to(Path(config.doc_path).resolve()).as_posix()
+    except ValueError:
+        return source
+
+
+def build_catalog(manifest: dict, vector_sums: dict, version: str = None) -> dict:
+    """
+    Small summary of the collection, maintained by ingestion.
+    :param manifest: ingest manifest {relative path: {"hash", "doc_type", "chunk_ids"}}
+    :param vector_sums: doc_type -> sum of the normalized chunk embeddings (for intent centroids)
+    :param version: collection version the catalog describes, defaults to the current one
+    :return: {"version", "doc_types": {doc_type: {"chunks", "files", "sources"}}, "vector_sums"}
+    """
+    doc_types = {}
+    for rel_path, entry in sorted(manifest.items()):
+        info = doc_types.setdefault(entry["doc_type"].lower(), {"chunks": 0, "files": 0, "sources": []})
+        info["chunks"] += len(entry["chunk_ids"])
+        info["files"] += 1
+        info["sources"].append(rel_path)
+    return {
+        "version": get_collection_version() if version is None else version,
+        "doc_types": doc_types,
+        "vector_sums": {t: np.asarray(v).tolist() for t, v in vector_sums.items() if t in doc_types},
+    }
+
+
+def catalog_from_collection(vectorstore) -> dict:
+    """Rebuild the catalog with one full scan (existing DBs without a catalog, or a stale one)."""
+    output = vectorstore._collection.get(include=["embeddings", "metadatas"])
+    doc_types, sources = {}, {}
+    for metadata in output["metadatas"] or []:
+        metadata = metadata or {}
+        doc_type = metadata.get("doc_type", "").lower()
+        if doc_type:
+            info = doc_types.setdefault(doc_type, {"chunks": 0, "files": 0, "sources": []})
+            info["chunks"] += 1
+            if metadata.get("source"):
+                sources.setdefault(doc_type, set()).add(_relative_source(metadata["source"]))
+    for doc_type, info in doc_types.items():
+        info["sources"] = sorted(sources.get(doc_type, ()))
+        info["files"] = len(info["sources"])
+
+    sums = {}
+    add_vector_sums(sums, output["embeddings"], [(m or {}).get("doc_type", "") for m in output["metadatas"] or []])
+    return {
+        "version": get_collection_version(),
+        "doc_types": doc_types,
+        "vector_sums": {t: v.tolist() for t, v in sums.items()},
+    }
+
+
+def save_catalog(catalog: dict, path: Path = config.catalog_file):
+    """Write the catalog atomically next to the vector DB."""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f)
+    tmp_path.replace(path)
+
+
+def load_catalog(path: Path = config.catalog_file, any_version: bool = False) -> dict | None:
+    """
+    :param any_version: also return a catalog written for another collection version
+    :return: the catalog, or None when it is missing or does not match the current collection
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            catalog = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if not any_version and catalog.get("version") != get_collection_version():
+        return None
+    return catalog
+
+
+def load_or_build_catalog(vectorstore, path: Path = config.catalog_file) -> dict:
+    """The persisted catalog when it is current, else one built by a scan (and persisted)."""
+    catalog = load_catalog(path)
+    if catalog is None:
+        catalog = catalog_from_collection(vectorstore)
+        try:
+            save_catalog(catalog, path)
+        except OSError:
+            pass  # read-only deployment: scan again on the next start
+    return catalog
+
+
+def catalog_centroids(catalog: dict) -> tuple:
+    """
+    :return: (sorted doc_type labels, normalized centroid matrix) from the stored vector sums
+    """
+    labels = sorted(t for t, info in catalog["doc_types"].items() if info["chunks"] and t in catalog["vector_sums"])
+    if not labels:
+        return [], np.empty((0, 0), dtype=np.float32)
+    centroids = np.asarray([catalog["vector_sums"][t] for t in labels], dtype=np.float32)
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+    return labels, centroids
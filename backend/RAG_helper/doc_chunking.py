@@ -1,9 +1,27 @@
 from backend import config
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
+from typing import Iterator
+from langchain_core.documents import Document
+from langchain_community.document_loaders import TextLoader
 from langchain.text_splitter import CharacterTextSplitter
 
 
+def load_folder(paths: list, doc_type: str) -> tuple:
+    """
+    Load a list of files of one doc_type (module level so process pools can pickle it)
+    :return: (documents, seconds spent loading)
+    """
+    start = time.perf_counter()
+    documents = []
+    for path in paths:
+        for doc in TextLoader(str(path), encoding="utf-8").load():
+            doc.metadata["doc_type"] = doc_type.lower()
+            documents.append(doc)
+    return documents, time.perf_counter() - start
+
+
 class Chunker:
     def __init__(self, path_folder: str = config.doc_path):
         """
@@ -12,57 +30,131 @@ class Chunker:
         :return: None
         """
         self.path_folder = path_folder
+        self.timings = {}
 
-    def load_documents(self) -> list | str | None:
+    def load_documents(
+            self,
+            workers: int = config.LOAD_WORKERS,
+            parallel: str = config.LOAD_PARALLEL,
+            use_processes: bool = False,
+    ) -> list:
         """
         Reads in documents using LangChain's loaders
         Goes through everything in the sub-folders of the generated documents
-        :return: list (read in documents)
+        :param workers: size of the loader pool (1 loads serially)
+        :param parallel: "file" loads individual files concurrently, "folder" one doc_type folder per worker
+        :param use_processes: use a process pool instead of threads (CPU-bound decoding)
+        :return: list (read in documents, in the same order as iter_files())
         """
+        files = self.list_files()
+        by_folder = {}
+        for path, doc_type in files:
+            by_folder.setdefault(doc_type, []).append(path)
 
-        base_path = Path(self.path_folder)
-        if base_path.exists():
-            # Get all subfolders (directories only)
-            folders = [f for f in base_path.iterdir() if f.is_dir()]
-            loader_kwargs = {'encoding': 'utf-8'}
-
-            documents = []
-            if folders:
-                for folder in folders:
-                    doc_type = folder.name
-                    loader = DirectoryLoader(
-                        str(folder),
-                        glob="**/*.md",
-                        loader_cls=TextLoader,
-                        loader_kwargs=loader_kwargs
-                    )
-                    folder_docs = loader.load()
-                    for doc in folder_docs:
-                        doc.metadata["doc_type"] = doc_type
-                        documents.append(doc)
-            else:
-                raise ValueError(f"No subfolders found in {base_path.resolve()}")
+        start = time.perf_counter()
+        if parallel == "folder":
+            tasks = [(paths, doc_type) for doc_type, paths in by_folder.items()]
+            load = load_folder
+        elif parallel == "file":
+            tasks = [([path], doc_type) for path, doc_type in files]
+            load = load_folder
         else:
-            raise ValueError(f"The specified path does not exist: {base_path.resolve()}")
+            raise ValueError(f"Unknown parallel mode '{parallel}', expected 'file' or 'folder'")
+
+        if workers <= 1:
+            results = [load(*task) for task in tasks]
+        else:
+            pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+            with pool_cls(max_workers=workers) as pool:
+                # map() keeps the input order, so the output is deterministic
+                results = list(pool.map(load, *zip(*tasks))) if tasks else []
+
+        documents = []
+        self.timings = {doc_type: {"files": len(paths), "seconds": 0.0} for doc_type, paths in by_folder.items()}
+        for (_, doc_type), (docs, seconds) in zip(tasks, results):
+            documents.extend(docs)
+            self.timings[doc_type]["seconds"] += seconds
+
+        wall = time.perf_counter() - start
+        print(f"Loaded {len(documents)} documents in {wall:.2f}s ({parallel} mode, {workers} workers)")
+        for doc_type, timing in self.timings.items():
+            print(f"  {doc_type}: {timing['files']} files, {timing['seconds']:.2f}s loading")
         return documents
 
+    def iter_files(self) -> Iterator[tuple]:
+        """
+        Markdown files under the doc_type sub-folders, folder by folder in a stable order
+        :return: generator of (file path, doc_type) tuples; doc_type is the lowercased
+            folder name, the form the intent router and every doc_type filter use
+        """
+        base_path = Path(self.path_folder)
+        if not base_path.exists():
+            raise ValueError(f"The specified path does not exist: {base_path.resolve()}")
+        folders = sorted(f for f in base_path.iterdir() if f.is_dir())
+        if not folders:
+            raise ValueError(f"No subfolders found in {base_path.resolve()}")
+        for folder in folders:
+            for path in sorted(folder.glob("**/*.md")):
+                # Skip hidden files and folders, like DirectoryLoader does
+                if not any(part.startswith(".") for part in path.relative_to(folder).parts):
+                    yield path, folder.name.lower()
+
+    def list_files(self) -> list:
+        """
+        All markdown files under the doc_type sub-folders
+        :return: list of (file path, doc_type) tuples
+        """
+        return list(self.iter_files())
+
+    @staticmethod
+    def splitter() -> CharacterTextSplitter:
+        # start_index lets the context stage merge overlapping neighbours
+        return CharacterTextSplitter(
+            chunk_size=config.CHUNK_SIZE,
+            chunk_overlap=config.CHUNK_OVERLAP,
+            add_start_index=True
+        )
+
+    def chunk_file(self, path: Path, doc_type: str) -> list:
+        """
+        Load and chunk a single file
+        :param path: markdown file
+        :param doc_type: name of the sub-folder the file lives in
+        :return: list (chunked docs of that file)
+        """
+        return self._split_file(path, doc_type, self.splitter())
+
+    @staticmethod
+    def _split_file(path: Path, doc_type: str, splitter: CharacterTextSplitter) -> list:
+        docs = TextLoader(str(path), encoding="utf-8").load()
+        for doc in docs:
+            doc.metadata["doc_type"] = doc_type.lower()
+        return splitter.split_documents(docs)
+
+    def iter_chunks(self) -> Iterator[Document]:
+        """
+        Load and chunk one file at a time, so only a single file's chunks are in memory
+        :return: generator of chunks with doc_type metadata
+        """
+        splitter = self.splitter()
+        for path, doc_type in self.iter_files():
+            yield from self._split_file(path, doc_type, splitter)
+
     def chunk(self) -> list:
         """
         chunk documents
         :return: list (list of chunked docs)
         """
         loaded_docs = self.load_documents()
-        if isinstance(loaded_docs, list):
-            text_splitter = CharacterTextSplitter(chunk_size=860, chunk_overlap=150)
-            chunks = text_splitter.split_documents(loaded_docs)
-            return chunks
-        return []
+        return self.splitter().split_documents(loaded_docs)
 
 
 if __name__ == "__main__":
     chunker = Chunker()
-    docs = chunker.chunk()
-    r_chunks = chunker.chunk()
-    print(len(r_chunks))
-    print(f"Document types: {', '.join((set(str(chunk.metadata['doc_type']) for chunk in r_chunks)))}")
+    n_chunks, doc_types = 0, set()
+    for r_chunk in chunker.iter_chunks():
+        n_chunks += 1
+        doc_types.add(str(r_chunk.metadata['doc_type']))
+    print(n_chunks)
+    print(f"Document types: {', '.join(doc_types)}")
 
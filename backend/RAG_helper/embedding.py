@@ -1,78 +1,244 @@
 from pathlib import Path
-from sklearn.manifold import TSNE
-import numpy as np
-import plotly.graph_objects as go
+import logging
 import shutil
-from backend.RAG_helper.doc_chunking import Chunker
+import threading
+from collections import OrderedDict
+import numpy as np
+from backend.RAG_helper.collection_version import bump_collection_version
+from backend.RAG_helper.doc_catalog import (
+    add_vector_sums, build_catalog, catalog_from_collection, load_catalog, save_catalog
+)
+from backend.RAG_helper.embedding_cache import EmbeddingCache
+from backend.RAG_helper.hybrid_retriever import BM25Index
+from backend.RAG_helper.ingest_manifest import file_hash, load_manifest, save_manifest, stale_chunk_ids
 from backend import config
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
+from backend.utils.startup_timer import startup_stage
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class LazyEncoder(Embeddings):
+    """
+    HuggingFace sentence encoder that imports sentence-transformers and loads
+    the model weights on first use (or on an explicit load()), so opening the
+    vectorstore and re-ingesting fully cached chunks never pay for it.
+    """
+
+    def __init__(self, model_name: str, **kwargs):
+        """
+        :param model_name: HuggingFace model name
+        :param kwargs: extra HuggingFaceEmbeddings fields (encode_kwargs, ...)
+        """
+        self.model_name = model_name
+        self.kwargs = kwargs
+        self._encoder = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Embeddings:
+        with self._lock:
+            if self._encoder is None:
+                with startup_stage("encoder_load"):
+                    from langchain_huggingface import HuggingFaceEmbeddings
+
+                    self._encoder = HuggingFaceEmbeddings(model_name=self.model_name, **self.kwargs)
+            return self._encoder
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.load().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.load().embed_query(text)
+
+
+class MemoizedEmbeddings(Embeddings):
+    """
+    Wraps an encoder and remembers the most recent query vectors, so a question
+    embedded for intent routing is not encoded again by the retriever.
+    """
+
+    def __init__(self, base: Embeddings, max_queries: int = config.QUERY_EMBEDDING_MEMO_SIZE):
+        self.base = base
+        self.max_queries = max_queries
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        with self._lock:
+            if text in self._queries:
+                self._queries.move_to_end(text)
+                return self._queries[text]
+        vector = self.base.embed_query(text)
+        with self._lock:
+            self._queries[text] = vector
+            if len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+        return vector
 
 
 class VectorEmbedding:
     def __init__(self, encoder_model: str = config.ENCODER_MODEL):
-        self.embedding = HuggingFaceEmbeddings(model_name=encoder_model)
+        # Document vectors go through the on-disk cache, query vectors through the in-memory memo
+        self.encoder = LazyEncoder(encoder_model, encode_kwargs={"batch_size": config.ENCODE_BATCH_SIZE})
+        self.cache = EmbeddingCache(self.encoder, encoder_model)
+        self.embedding = MemoizedEmbeddings(self.cache)
+        self._pipeline = None
+        self.vectorstore = None
+
+    @property
+    def pipeline(self):
+        """Ingest pipeline, built on first use (loaders and splitters are not needed to serve)."""
+        if self._pipeline is None:
+            from backend.RAG_helper.ingest_pipeline import IngestPipeline
+
+            self._pipeline = IngestPipeline(self.embedding)
+        return self._pipeline
+
+    def create_vector(self, incremental: bool = False):
+        """
+        Build the vectorstore from the generated documents.
+        :param incremental: only re-embed added/modified files and drop removed ones,
+            keeping the existing collection online (falls back to a full rebuild
+            when there is no DB or manifest yet)
+        :return: vectorstore (Chroma or NumpyVectorStore, see config.VECTOR_BACKEND)
+        """
+        has_db = config.db_folder.exists() and any(config.db_folder.iterdir())
+        if incremental and has_db and config.manifest_file.exists():
+            return self.update_vector()
 
-    def create_vector(self):
-        if config.db_folder.exists() and any(config.db_folder.iterdir()):
+        if has_db:
             shutil.rmtree(config.db_folder)  # Delete entire folder
             print(f"Deleted existing database folder")
 
-        self.vectorstore = Chroma.from_documents(
-            documents=Chunker().chunk(),
-            embedding=self.embedding,
-            persist_directory=str(config.db_folder)
-        )
-        print(f"Vectorstore created at {config.db_folder}")
+        from backend.RAG_helper.doc_chunking import Chunker
+
+        chunker = Chunker()
+        self.vectorstore = self._open_store()
+        manifest = self._ingest(self.vectorstore, chunker.iter_files(), Path(chunker.path_folder))
+        save_manifest(manifest)
+        bump_collection_version()
+        BM25Index.from_collection(self.vectorstore).save()  # keyword index follows every rebuild
+        save_catalog(build_catalog(manifest, self.pipeline.vector_sums))
+        print(f"Vectorstore created at {config.db_folder} "
+              f"(embedding cache: {self.cache.hits} hits, {self.cache.misses} encoded)")
         return self.vectorstore
 
+    def _ingest(self, vectorstore, files, base_path: Path) -> dict:
+        """Run the ingest pipeline, then persist the embedding cache index once (also on failure)."""
+        try:
+            return self.pipeline.run(vectorstore, files, base_path)
+        finally:
+            self.cache.flush()
+
+    def update_vector(self):
+        """
+        Incremental ingest driven by the manifest of (file, content hash, chunk IDs).
+        New chunks are added before stale ones are deleted, so the collection
+        stays queryable the whole time. The doc_type catalog is updated from the
+        changed chunks only (rebuilt by a scan if it was missing or stale).
+        :return: vectorstore (Chroma or NumpyVectorStore, see config.VECTOR_BACKEND)
+        """
+        from backend.RAG_helper.doc_chunking import Chunker
+
+        chunker = Chunker()
+        base_path = Path(chunker.path_folder)
+        manifest = load_manifest()
+        catalog = load_catalog()  # only trusted if it matches the collection before this update
+        vectorstore = self.load_vector()
+
+        current, changed = {}, []
+        for path, doc_type in chunker.iter_files():
+            rel_path = path.relative_to(base_path).as_posix()
+            previous = manifest.get(rel_path)
+            if previous and previous["hash"] == file_hash(path) and previous["doc_type"] == doc_type:
+                current[rel_path] = previous
+            else:
+                changed.append((path, doc_type))
+        changed_paths = [path.relative_to(base_path).as_posix() for path, _ in changed]
+        modified = sum(1 for rel_path in changed_paths if rel_path in manifest)
+        added = len(changed) - modified
+        seen = set(current) | set(changed_paths)
+        removed = [rel_path for rel_path in manifest if rel_path not in seen]
+
+        # The catalog loses every old vector of changed and removed files, including the
+        # ones re-written under the same ID below, so read them before they are replaced
+        vector_sums = {t: np.asarray(v) for t, v in (catalog or {}).get("vector_sums", {}).items()}
+        outgoing = [chunk_id for rel_path in changed_paths + removed
+                    for chunk_id in manifest.get(rel_path, {}).get("chunk_ids", [])]
+        if catalog is not None and outgoing:
+            old = vectorstore._collection.get(ids=outgoing, include=["embeddings", "metadatas"])
+            add_vector_sums(vector_sums, old["embeddings"],
+                            [(m or {}).get("doc_type", "") for m in old["metadatas"]], sign=-1)
+
+        current.update(self._ingest(vectorstore, changed, base_path))
+        for doc_type, total in self.pipeline.vector_sums.items():
+            vector_sums[doc_type] = vector_sums[doc_type] + total if doc_type in vector_sums else total
+
+        # Only IDs this update did not write again are stale (a file whose doc_type
+        # changed but whose content did not keeps its chunk IDs)
+        stale_ids = stale_chunk_ids(manifest, current)
+        if stale_ids:
+            vectorstore.delete(ids=stale_ids)
+
+        save_manifest(current)
+        if added or modified or removed:
+            bump_collection_version()
+            BM25Index.from_collection(vectorstore).save()
+        if catalog is None:
+            save_catalog(catalog_from_collection(vectorstore))
+        elif added or modified or removed:
+            save_catalog(build_catalog(current, vector_sums))
+        print(f"Vectorstore updated: {added} added, {modified} modified, {len(removed)} removed, "
+              f"{len(current) - added - modified} unchanged")
+        self.vectorstore = vectorstore
+        return vectorstore
+
     def load_vector(self):
         if not config.db_folder.exists() or not any(config.db_folder.iterdir()):
             raise FileNotFoundError(f"No vectorstore found at {config.db_folder}")
 
-        print(f"Vectorstore loaded from {config.db_folder}")
+        with startup_stage(f"{config.VECTOR_BACKEND}_open"):
+            self.vectorstore = self._open_store()
+        logger.info("Vectorstore (%s) loaded from %s", config.VECTOR_BACKEND, config.db_folder)
+        return self.vectorstore
+
+    def _open_store(self):
+        """Open the store selected by config.VECTOR_BACKEND on config.db_folder."""
+        if config.VECTOR_BACKEND == "numpy":
+            from backend.RAG_helper.numpy_store import NumpyVectorStore
+
+            return NumpyVectorStore(str(config.db_folder), self.embedding)
+        if config.VECTOR_BACKEND != "chroma":
+            raise ValueError(f"Unknown VECTOR_BACKEND '{config.VECTOR_BACKEND}', expected 'chroma' or 'numpy'")
+
+        from langchain_chroma import Chroma
+
         return Chroma(
             persist_directory=str(config.db_folder),
             embedding_function=self.embedding
         )
 
-    def visual_rep(self):
-        output = self.vectorstore._collection.get(include=["embeddings", "documents", "metadatas"])
-        vectors = np.array(output["embeddings"])
-        documents = output['documents']
-        metadatas = output['metadatas']
-        doc_types = [metadata['doc_type'] for metadata in metadatas]
-        unique_doc_types = list({chunk.metadata.get('doc_type', 'unknown') for chunk in self.chunks})
-        palette = ['blue', 'green', 'red', 'orange', 'purple', 'cyan']
-        # Zip unique types to colors safely
-        color_map = {t: palette[i % len(palette)] for i, t in enumerate(unique_doc_types)}
-        # Map your actual doc_types to colors
-        colours = [color_map.get(t, "gray") for t in doc_types]
-        tsne = TSNE(n_components=3, random_state=42)
-        reduced_vectors = tsne.fit_transform(vectors)
-        # Create the 3D scatter plot
-        fig = go.Figure(data=[go.Scatter3d(
-            x=reduced_vectors[:, 0],
-            y=reduced_vectors[:, 1],
-            z=reduced_vectors[:, 2],
-            mode='markers',
-            marker=dict(size=5, color=colours, opacity=0.8),
-            text=[f"Type: {t}<br>Text: {d[:100]}..." for t, d in zip(doc_types, documents)],
-            hoverinfo='text'
-        )])
-
-        fig.update_layout(
-            title='3D Chroma Vector Store Visualization',
-            scene=dict(xaxis_title='x', yaxis_title='y', zaxis_title='z'),
-            width=900,
-            height=700,
-            margin=dict(r=20, b=10, l=10, t=40)
-        )
-        fig.show()
+    def visual_rep(self, method: str = "pca", per_type: int = config.VISUAL_SAMPLE_PER_TYPE):
+        """
+        Write an HTML 3-D plot of a stratified sample of the store (see visualization.visualize()).
+        :param method: "pca" or "tsne"
+        :param per_type: chunks sampled per doc_type
+        :return: path of the HTML file
+        """
+        from backend.RAG_helper.visualization import visualize
+
+        if self.vectorstore is None:
+            self.load_vector()
+        return visualize(self.vectorstore, method=method, per_type=per_type)
 
 
 if __name__ == "__main__":
+    import sys
+
     embedding = VectorEmbedding()
-    embedding.create_vector()
+    embedding.create_vector(incremental="--incremental" in sys.argv)
     embedding.load_vector()
     embedding.visual_rep()
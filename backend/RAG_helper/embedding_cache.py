@@ -0,0 +1,185 @@
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+import numpy as np
+from backend import config
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingCache(Embeddings):
+    """
+    Disk-backed, content-addressed cache for document embeddings.
+    Vectors live in a memory-mapped float32 matrix (vectors.f32) and an index
+    file maps sha256(model name, chunk text) to a row. Only texts that are not
+    in the cache reach the encoder, so re-indexing unchanged chunks is free.
+    When `max_entries` is reached, the least recently used rows are reused.
+    Queries are passed straight to the encoder.
+    The index is written by flush() (once per ingest run), not on every batch.
+    """
+
+    def __init__(
+            self,
+            base: Embeddings,
+            model_name: str,
+            cache_dir: Path = config.embedding_cache_dir,
+            max_entries: int = config.EMBEDDING_CACHE_MAX_ENTRIES,
+    ):
+        """
+        :param base: encoder doing the actual work
+        :param model_name: encoder model name, part of every cache key
+        :param cache_dir: root folder, one sub-folder per model
+        :param max_entries: maximum number of cached vectors
+        """
+        self.base = base
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.folder = Path(cache_dir) / re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self._opened = False  # opened lazily, the serving path never needs it
+        self._vectors = None
+        self._rows = {}  # key -> row
+        self._last_used = np.zeros(0, dtype=np.int64)  # row -> tick of last use
+        self._free = []
+        self._tick = 0
+        self._dim = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------
+    # Storage
+    # ------------------------------
+    @property
+    def _index_path(self) -> Path:
+        return self.folder / "index.json"
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.folder / "vectors.f32"
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _open(self):
+        """Load the index and map the vector file once, if a cache exists on disk."""
+        if self._opened:
+            return
+        self._opened = True
+        if not (self._index_path.exists() and self._vectors_path.exists()):
+            return
+        with open(self._index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        self._dim = index["dim"]
+        self._rows = index["rows"]
+        self._tick = index["tick"]
+        capacity = index["capacity"]
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self._dim))
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        for key, row in self._rows.items():
+            self._last_used[row] = index["last_used"].get(key, 0)
+        used = set(self._rows.values())
+        self._free = [row for row in range(capacity) if row not in used]
+
+    def _grow(self, needed: int):
+        """Make room for `needed` more rows: grow the file first, evict LRU rows at the limit."""
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if len(self._free) >= needed:
+            return
+        new_capacity = min(self.max_entries, max(1024, capacity * 2, capacity + needed))
+        if new_capacity > capacity:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            vectors = np.memmap(self._vectors_path.with_suffix(".tmp"), dtype=np.float32, mode="w+",
+                                shape=(new_capacity, self._dim))
+            if capacity:
+                vectors[:capacity] = self._vectors
+                del self._vectors
+            vectors.flush()
+            del vectors
+            self._vectors_path.with_suffix(".tmp").replace(self._vectors_path)
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                      shape=(new_capacity, self._dim))
+            self._last_used = np.concatenate([self._last_used, np.zeros(new_capacity - capacity, dtype=np.int64)])
+            self._free.extend(range(capacity, new_capacity))
+        if len(self._free) < needed:
+            # Evict in steps of 10% of the cache, and persist the index before the
+            # evicted rows are overwritten, so an index on disk never maps a key to
+            # another text's vector (one index write per step, not per batch)
+            by_row = {row: key for key, row in self._rows.items()}
+            used_rows = np.array(sorted(by_row), dtype=np.int64)
+            n_evict = max(needed - len(self._free), self.max_entries // 10)
+            oldest = used_rows[np.argsort(self._last_used[used_rows])][:n_evict]
+            for row in oldest.tolist():
+                del self._rows[by_row[row]]
+                self._free.append(row)
+            self._write_index()
+
+    def flush(self):
+        """Persist the index (and pending vector writes) if the cache changed since the last flush."""
+        with self._lock:
+            if self._dirty:
+                self._write_index()
+
+    def _write_index(self):
+        self.folder.mkdir(parents=True, exist_ok=True)
+        if self._vectors is not None:
+            self._vectors.flush()
+        index = {
+            "model": self.model_name,
+            "dim": self._dim,
+            "capacity": 0 if self._vectors is None else int(self._vectors.shape[0]),
+            "tick": self._tick,
+            "rows": self._rows,
+            "last_used": {key: int(self._last_used[row]) for key, row in self._rows.items()},
+        }
+        tmp_path = self._index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        tmp_path.replace(self._index_path)
+        self._dirty = False
+
+    # ------------------------------
+    # Embeddings interface
+    # ------------------------------
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text) for text in texts]
+        with self._lock:
+            self._open()
+            self._tick += 1
+            cached = {}
+            if self._rows:
+                for key in set(keys):
+                    row = self._rows.get(key)
+                    if row is not None:
+                        cached[key] = np.array(self._vectors[row])
+                        self._last_used[row] = self._tick
+                        self._dirty = True
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        self.hits += len(texts) - sum(1 for key in keys if key in missing)
+        self.misses += len(missing)
+
+        if missing:
+            new_vectors = np.asarray(self.base.embed_documents(list(missing.values())), dtype=np.float32)
+            with self._lock:
+                self._dim = self._dim or new_vectors.shape[1]
+                # Another thread may have stored some of these keys meanwhile
+                store = [(key, vector) for key, vector in zip(missing, new_vectors) if key not in self._rows]
+                store = store[-self.max_entries:]
+                self._grow(len(store))
+                for key, vector in store:
+                    row = self._free.pop()
+                    self._vectors[row] = vector
+                    self._rows[key] = row
+                    self._last_used[row] = self._tick
+                self._dirty = True
+            cached.update(zip(missing, new_vectors))
+
+        return [cached[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.base.embed_query(text)
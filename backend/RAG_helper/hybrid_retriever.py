@@ -0,0 +1,119 @@
+import math
+import pickle
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+import numpy as np
+from backend import config
+from backend.RAG_helper.collection_version import get_collection_version
+from langchain_core.documents import Document
+
+# Words plus compound identifiers such as "ow-doc-1003" or "v2.1"
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list:
+    """Lowercased terms; compound identifiers are kept whole and also split into their parts."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        parts = re.split(r"[-_./]", token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = config.RRF_K) -> list:
+    """
+    Fuse several ranked ID lists: score(id) = sum(1 / (k + rank)).
+    :return: list of (id, fused score), best first
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    Compact in-process BM25 inverted index over the chunks in the vector DB.
+    Postings are stored per term as numpy arrays of (chunk row, term frequency).
+    """
+
+    def __init__(self, ids: list, texts: list, metadatas: list, version: str = "", k1: float = 1.5, b: float = 0.75):
+        self.ids = list(ids)
+        self.texts = list(texts)
+        self.metadatas = [m or {} for m in metadatas]
+        self.version = version
+        self.k1 = k1
+        self.b = b
+        self.doc_types = np.array([m.get("doc_type", "") for m in self.metadatas])
+
+        postings = defaultdict(lambda: ([], []))
+        self.doc_len = np.zeros(len(self.texts), dtype=np.float32)
+        for row, text in enumerate(self.texts):
+            counts = Counter(tokenize(text))
+            self.doc_len[row] = sum(counts.values())
+            for term, tf in counts.items():
+                rows, tfs = postings[term]
+                rows.append(row)
+                tfs.append(tf)
+        self.postings = {
+            term: (np.array(rows, dtype=np.int32), np.array(tfs, dtype=np.float32))
+            for term, (rows, tfs) in postings.items()
+        }
+        self.avg_len = float(self.doc_len.mean()) if len(self.texts) else 0.0
+
+    @classmethod
+    def from_collection(cls, vectorstore) -> "BM25Index":
+        """Build from the chunks stored in the vectorstore."""
+        output = vectorstore._collection.get(include=["documents", "metadatas"])
+        return cls(output["ids"], output["documents"], output["metadatas"], version=get_collection_version())
+
+    def search(self, query: str, k: int, doc_type: str = None) -> list:
+        """
+        :return: list of (chunk row, score), best first, only rows with a positive score
+        """
+        n = len(self.texts)
+        if not n:
+            return []
+        scores = np.zeros(n, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / (self.avg_len or 1.0))
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            rows, tfs = self.postings[term]
+            idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm[rows])
+        if doc_type:
+            scores[self.doc_types != doc_type] = 0.0
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top if scores[row] > 0]
+
+    def document(self, row: int) -> Document:
+        return Document(id=self.ids[row], page_content=self.texts[row], metadata=self.metadatas[row])
+
+    def save(self, path: Path = config.bm25_file):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load_or_build(cls, vectorstore, path: Path = config.bm25_file) -> "BM25Index":
+        """Load the sidecar index if it matches the current collection version, else rebuild it."""
+        version = get_collection_version()
+        try:
+            with open(path, "rb") as f:
+                index = pickle.load(f)
+            if index.version == version:
+                return index
+        except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+            pass
+        index = cls.from_collection(vectorstore)
+        index.save(path)
+        return index
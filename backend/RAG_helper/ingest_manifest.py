@@ -0,0 +1,52 @@
+import hashlib
+import json
+from pathlib import Path
+from backend import config
+
+
+def file_hash(path: Path) -> str:
+    """sha256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids(rel_path: str, content_hash: str, count: int) -> list:
+    """
+    Deterministic chunk IDs for one file version.
+    The content hash is part of the ID, so a modified file's new chunks never
+    collide with the old ones and can be added before the old ones are deleted.
+    """
+    path_key = hashlib.sha1(rel_path.encode("utf-8")).hexdigest()[:16]
+    return [f"{path_key}-{content_hash[:12]}-{i}" for i in range(count)]
+
+
+def stale_chunk_ids(previous: dict, current: dict) -> list:
+    """
+    Chunk IDs listed in the previous manifest that the current one no longer has:
+    chunks of modified and removed files. IDs written again by this update (same
+    path and content, e.g. only the doc_type changed) are not stale.
+    """
+    keep = {chunk_id for entry in current.values() for chunk_id in entry["chunk_ids"]}
+    return [chunk_id for entry in previous.values() for chunk_id in entry["chunk_ids"] if chunk_id not in keep]
+
+
+def load_manifest(path: Path = config.manifest_file) -> dict:
+    """
+    :return: {relative file path: {"hash", "doc_type", "chunk_ids"}}, empty when missing
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["files"]
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(files: dict, path: Path = config.manifest_file):
+    """Write the manifest atomically so a crash never leaves half a file."""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"files": files}, f, indent=1, sort_keys=True)
+    tmp_path.replace(path)
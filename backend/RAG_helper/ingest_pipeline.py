@@ -0,0 +1,125 @@
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+from backend import config
+from backend.RAG_helper.doc_catalog import add_vector_sums
+from backend.RAG_helper.doc_chunking import Chunker
+from backend.RAG_helper.ingest_manifest import file_hash, chunk_ids
+
+
+def chunk_one_file(path: Path, doc_type: str, base_path: Path) -> tuple:
+    """
+    Hash and chunk one file (runs in a worker process).
+    :return: (relative path, content hash, doc_type, [(text, metadata)], chunk IDs)
+    """
+    rel_path = path.relative_to(base_path).as_posix()
+    content_hash = file_hash(path)
+    chunks = Chunker(base_path).chunk_file(path, doc_type)
+    ids = chunk_ids(rel_path, content_hash, len(chunks))
+    return rel_path, content_hash, doc_type, [(c.page_content, c.metadata) for c in chunks], ids
+
+
+class IngestPipeline:
+    """
+    Streaming ingest: files are chunked in a process pool, chunks are encoded in
+    batches of `batch_size`, and each encoded batch is written to the collection
+    on a writer thread while the next batch encodes.
+    """
+
+    def __init__(
+            self,
+            embedding,
+            batch_size: int = config.INGEST_BATCH_SIZE,
+            workers: int = config.INGEST_WORKERS,
+    ):
+        """
+        :param embedding: document encoder (VectorEmbedding().embedding)
+        :param batch_size: chunks per encode call and per DB write
+        :param workers: processes used for reading and chunking (0 chunks in-process)
+        """
+        self.embedding = embedding
+        self.batch_size = batch_size
+        self.workers = workers
+        self.stats = {}
+        self.vector_sums = {}  # doc_type -> sum of normalized vectors written by the last run()
+
+    def _chunked_files(self, files: Iterable, base_path: Path):
+        """Yield chunk_one_file() results in input order, keeping a bounded number of files in flight."""
+        if self.workers <= 0:
+            for path, doc_type in files:
+                yield chunk_one_file(path, doc_type, base_path)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for path, doc_type in files:
+                pending.append(pool.submit(chunk_one_file, path, doc_type, base_path))
+                if len(pending) >= self.workers * 4:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    @staticmethod
+    def _write(collection, ids: list, vectors: list, texts: list, metadatas: list):
+        collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+
+    def run(self, vectorstore, files: Iterable, base_path: Path) -> dict:
+        """
+        Chunk, encode and write the given files into the vectorstore.
+        :param vectorstore: open Chroma store to write into
+        :param files: (file path, doc_type) pairs, e.g. Chunker().iter_files(); consumed lazily
+        :param base_path: root of the document tree (manifest paths are relative to it)
+        :return: manifest entries {relative path: {"hash", "doc_type", "chunk_ids"}}
+        """
+        start = time.perf_counter()
+        manifest = {}
+        self.vector_sums = {}
+        batch_ids, batch_texts, batch_metas = [], [], []
+        encode_seconds = 0.0
+        n_chunks = 0
+        write = None
+
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            def flush():
+                nonlocal write, encode_seconds
+                encode_start = time.perf_counter()
+                vectors = self.embedding.embed_documents(batch_texts)
+                encode_seconds += time.perf_counter() - encode_start
+                add_vector_sums(self.vector_sums, vectors, [m.get("doc_type", "") for m in batch_metas])
+                if write is not None:
+                    write.result()  # at most one write in flight
+                write = writer.submit(self._write, vectorstore._collection,
+                                      list(batch_ids), vectors, list(batch_texts), list(batch_metas))
+                batch_ids.clear()
+                batch_texts.clear()
+                batch_metas.clear()
+
+            for rel_path, content_hash, doc_type, chunks, ids in self._chunked_files(files, base_path):
+                manifest[rel_path] = {"hash": content_hash, "doc_type": doc_type, "chunk_ids": ids}
+                for (text, metadata), chunk_id in zip(chunks, ids):
+                    batch_ids.append(chunk_id)
+                    batch_texts.append(text)
+                    batch_metas.append(metadata)
+                    n_chunks += 1
+                    if len(batch_ids) >= self.batch_size:
+                        flush()
+            if batch_ids:
+                flush()
+            if write is not None:
+                write.result()
+
+        elapsed = time.perf_counter() - start
+        self.stats = {
+            "documents": len(manifest),
+            "chunks": n_chunks,
+            "seconds": elapsed,
+            "encode_seconds": encode_seconds,
+            "documents_per_second": len(manifest) / elapsed if elapsed else 0.0,
+            "chunks_per_second": n_chunks / elapsed if elapsed else 0.0,
+        }
+        print(f"Ingested {len(manifest)} documents / {n_chunks} chunks in {elapsed:.1f}s "
+              f"({self.stats['documents_per_second']:.1f} docs/s, {self.stats['chunks_per_second']:.1f} chunks/s, "
+              f"{encode_seconds:.1f}s encoding)")
+        return manifest
@@ -1,28 +1,24 @@
-from backend import config
-from langchain_openai import ChatOpenAI
+import logging
+from backend.RAG_helper.doc_catalog import load_or_build_catalog
+from backend.utils.ollama_client import get_chat_llm
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 
+logger = logging.getLogger(__name__)
+
 
 def get_doc_types(vectorstore):
-    """Extract unique doc_type values from vectorstore metadata."""
+    """Unique doc_type values, read from the ingest catalog (one metadata scan only if it is missing)."""
     try:
-        all_metas = vectorstore._collection.get(include=["metadatas"])["metadatas"]
-        doc_types = {m.get("doc_type", "").lower() for m in all_metas if m.get("doc_type")}
-        return list(doc_types) or ["general"]
+        return sorted(load_or_build_catalog(vectorstore)["doc_types"]) or ["general"]
     except Exception as e:
-        print(f"Could not extract doc_types: {e}")
+        logger.warning("Could not extract doc_types: %s", e)
         return ["general"]
 
 
 def build_intent_classifier(doc_types):
     """Build an LLM chain that classifies questions into available doc_types."""
-    llm = ChatOpenAI(
-        base_url=config.llama_base_url,
-        api_key="ollama",
-        model="llama3.2:latest",
-        temperature=0.0,
-    )
+    llm = get_chat_llm(temperature=0.0)
 
     intent_prompt = PromptTemplate.from_template("""
 You are an intent classification assistant for Oilwell Corporation.
@@ -46,9 +42,24 @@ def detect_intent(question: str, intent_chain: LLMChain, doc_types: list) -> str
         doc_types_str = ", ".join(doc_types)
         intent = intent_chain.invoke({"question": question, "doc_types": doc_types_str})["text"].strip().lower()
         if intent not in doc_types and intent != "general":
-            print(f"Unrecognized intent '{intent}', defaulting to general.")
+            logger.info("Unrecognized intent '%s', defaulting to general.", intent)
+            intent = "general"
+        return intent
+    except Exception as e:
+        logger.warning("Intent detection failed: %s", e)
+        return "general"
+
+
+async def adetect_intent(question: str, intent_chain: LLMChain, doc_types: list) -> str:
+    """Async variant of detect_intent() for the asyncio chat path."""
+    try:
+        doc_types_str = ", ".join(doc_types)
+        result = await intent_chain.ainvoke({"question": question, "doc_types": doc_types_str})
+        intent = result["text"].strip().lower()
+        if intent not in doc_types and intent != "general":
+            logger.info("Unrecognized intent '%s', defaulting to general.", intent)
             intent = "general"
         return intent
     except Exception as e:
-        print(f"Intent detection failed: {e}")
+        logger.warning("Intent detection failed: %s", e)
         return "general"
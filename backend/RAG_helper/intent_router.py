@@ -0,0 +1,164 @@
+import asyncio
+import re
+import time
+from contextlib import nullcontext
+from typing import NamedTuple
+import numpy as np
+from backend import config
+from backend.RAG_helper.doc_catalog import catalog_centroids, load_or_build_catalog
+from backend.RAG_helper.intent_classifier import detect_intent, adetect_intent
+from backend.utils.metrics import metrics
+
+
+class RouteResult(NamedTuple):
+    intent: str
+    path: str  # "rule", "embedding" or "llm"
+    confidence: float
+
+
+def word_forms(name: str) -> list:
+    """The name plus its simple singular/plural form ("policies" -> ["policies", "policy"])."""
+    if name.endswith("ies"):
+        return [name, name[:-3] + "y"]
+    if name.endswith("s"):
+        return [name, name[:-1]]
+    return [name, name + "s"]
+
+
+class IntentRouter:
+    """
+    Fast intent routing in front of the LLM classifier.
+    1. Rule path: the question names exactly one doc_type (e.g. "policy", "employees").
+    2. Embedding path: cosine similarity of the question against per-doc_type
+       centroids of the chunk embeddings already stored in the vectorstore.
+    3. LLM path: only when the margin between the two best centroids is too small.
+    """
+
+    def __init__(
+            self,
+            vectorstore,
+            intent_chain=None,
+            doc_types: list = None,
+            margin: float = config.INTENT_MARGIN,
+            min_score: float = config.INTENT_MIN_SCORE,
+    ):
+        """
+        :param vectorstore: loaded Chroma store (its embedding function is reused)
+        :param intent_chain: LLM classifier from build_intent_classifier(), used as fallback
+        :param doc_types: known categories, defaults to the ones found in the store
+        :param margin: minimum gap between the top two centroid scores to trust the embedding path
+        :param min_score: minimum top centroid score to trust the embedding path
+        """
+        self.vectorstore = vectorstore
+        self.embedding = vectorstore.embeddings
+        self.intent_chain = intent_chain
+        self.margin = margin
+        self.min_score = min_score
+        self.labels, self.centroids = self._build_centroids(vectorstore)
+        self.doc_types = doc_types or self.labels or ["general"]
+        self.keywords = self._build_keywords(self.doc_types)
+
+    @staticmethod
+    def _build_centroids(vectorstore) -> tuple:
+        """
+        Per-doc_type centroids (mean of the normalized chunk embeddings), computed from
+        the vector sums in the ingest catalog instead of scanning every embedding.
+        """
+        return catalog_centroids(load_or_build_catalog(vectorstore))
+
+    @staticmethod
+    def _build_keywords(doc_types: list) -> dict:
+        """Map simple singular/plural forms of each doc_type name to the doc_type."""
+        keywords = {}
+        for doc_type in doc_types:
+            for form in word_forms(doc_type):
+                keywords[form] = doc_type
+        for word, doc_type in config.INTENT_KEYWORDS.items():
+            if doc_type in doc_types:
+                keywords[word] = doc_type
+        return keywords
+
+    def match_rules(self, question: str) -> str | None:
+        """Return the doc_type if the question mentions exactly one category by name."""
+        words = set(re.findall(r"[a-z]+", question.lower()))
+        matched = {self.keywords[w] for w in words if w in self.keywords}
+        return matched.pop() if len(matched) == 1 else None
+
+    def score(self, vector) -> list:
+        """Cosine similarity of a query vector against every centroid, best first."""
+        if not self.labels:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) + 1e-12)
+        scores = self.centroids @ query
+        order = np.argsort(scores)[::-1]
+        return [(self.labels[i], float(scores[i])) for i in order]
+
+    def route(self, question: str, vector=None) -> RouteResult:
+        """
+        Classify a question, taking the cheapest path that is confident enough.
+        :param question: user question
+        :param vector: precomputed query embedding, encoded here when not given
+        :return: RouteResult (intent, path taken, confidence)
+        """
+        start = time.perf_counter()
+        result = self._route(question, vector)
+        metrics.observe("stage_seconds", time.perf_counter() - start, stage="intent")
+        metrics.incr("intent_route_total", path=result.path)
+        return result
+
+    def _route_without_llm(self, question: str, vector) -> tuple:
+        """
+        Rule and embedding paths only.
+        :return: (RouteResult, margin), the result is None when the LLM has to decide
+        """
+        rule_intent = self.match_rules(question)
+        if rule_intent:
+            return RouteResult(rule_intent, "rule", 1.0), 1.0
+
+        if vector is None and self.labels:
+            vector = self.embedding.embed_query(question)
+        ranked = self.score(vector) if vector is not None else []
+        margin = 0.0
+        if ranked:
+            top_label, top_score = ranked[0]
+            second_score = ranked[1][1] if len(ranked) > 1 else -1.0
+            margin = top_score - second_score
+            if top_score >= self.min_score and margin >= self.margin:
+                return RouteResult(top_label, "embedding", margin), margin
+
+        if self.intent_chain is None:
+            return RouteResult(ranked[0][0] if ranked else "general", "embedding", margin), margin
+        return None, margin
+
+    def _route(self, question: str, vector) -> RouteResult:
+        result, margin = self._route_without_llm(question, vector)
+        if result:
+            return result
+        # Embedding path was not decisive: the reported confidence is its margin
+        intent = detect_intent(question, self.intent_chain, self.doc_types)
+        return RouteResult(intent, "llm", margin)
+
+    async def aroute(self, question: str, vector=None, limiter=None) -> RouteResult:
+        """
+        Async route() for the asyncio chat path.
+        :param limiter: RequestLimiter guarding the LLM fallback call
+        """
+        start = time.perf_counter()
+        if vector is None and self.labels:
+            vector = await asyncio.to_thread(self.embedding.embed_query, question)
+        result, margin = self._route_without_llm(question, vector)
+        if result is None:
+            async with limiter.slot() if limiter else nullcontext():
+                intent = await adetect_intent(question, self.intent_chain, self.doc_types)
+            result = RouteResult(intent, "llm", margin)
+        metrics.observe("stage_seconds", time.perf_counter() - start, stage="intent")
+        metrics.incr("intent_route_total", path=result.path)
+        return result
+
+    def stats(self) -> dict:
+        """How often each path was taken since startup."""
+        counts = {path: metrics.counter("intent_route_total", path=path) for path in ("rule", "embedding", "llm")}
+        total = sum(counts.values())
+        counts["llm_avoided_ratio"] = (1 - counts["llm"] / total) if total else 0.0
+        return counts
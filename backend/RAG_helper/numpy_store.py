@@ -0,0 +1,423 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from typing import Iterable, Optional
+import numpy as np
+from backend import config
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+_DTYPES = {"float16": np.float16, "int8": np.int8}
+_SQL_BATCH = 900  # IN (...) lists stay under SQLite's bound-parameter limit
+
+
+def _batches(values: list, size: int = _SQL_BATCH):
+    """Yield (placeholders, batch) pairs for IN (...) queries over long ID/row lists."""
+    for start in range(0, len(values), size):
+        batch = values[start:start + size]
+        yield ",".join("?" * len(batch)), batch
+
+
+class NumpyIndex:
+    """
+    Memory-mapped vector index in one folder:
+      vectors.bin  L2-normalized embeddings, float16 or int8 (one row per chunk)
+      scales.bin   per-row dequantization scale (int8 only)
+      codes.bin    int16 doc_type code per row, -1 for a free (deleted) row
+      chunks.db    SQLite table row -> (id, doc_type, text, metadata JSON)
+      index.json   dim, dtype, capacity, row count and the doc_type code table
+    Search is a blocked matrix product over the mapped rows with the doc_type
+    filter applied as a mask, so only the top-k rows ever touch SQLite.
+    Readers reopen the index when another process rewrites index.json.
+    """
+
+    def __init__(self, folder: Path, dtype: str = config.NUMPY_STORE_DTYPE):
+        """
+        :param folder: index folder, created on the first write
+        :param dtype: storage type for new indexes, "float16" or "int8" (an existing index keeps its own)
+        """
+        if dtype not in _DTYPES:
+            raise ValueError(f"Unknown dtype '{dtype}', expected one of {sorted(_DTYPES)}")
+        self.folder = Path(folder)
+        self.dtype = dtype
+        self.dim = 0
+        self.capacity = 0
+        self.n_rows = 0
+        self.doc_types = []  # code -> doc_type
+        self._vectors = None
+        self._scales = None
+        self._codes = None
+        self._free = []
+        self._mtime = None
+        self._db = None
+        self._lock = threading.RLock()
+        self._open()
+
+    # ------------------------------
+    # Storage
+    # ------------------------------
+    def _path(self, name: str) -> Path:
+        return self.folder / name
+
+    def _connect(self):
+        if self._db is None:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self._path("chunks.db"), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, doc_type TEXT, text TEXT, metadata TEXT)"
+            )
+        return self._db
+
+    def _map(self, name: str, dtype, shape: tuple):
+        return np.memmap(self._path(name), dtype=dtype, mode="r+", shape=shape)
+
+    def _open(self):
+        """(Re)load index.json and map the arrays, if the index exists on disk."""
+        index_path = self._path("index.json")
+        try:
+            mtime = index_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        self._mtime = mtime
+        self.dtype, self.dim, self.capacity = index["dtype"], index["dim"], index["capacity"]
+        self.n_rows, self.doc_types = index["n_rows"], index["doc_types"]
+        self._vectors = self._map("vectors.bin", _DTYPES[self.dtype], (self.capacity, self.dim))
+        self._scales = self._map("scales.bin", np.float32, (self.capacity,)) if self.dtype == "int8" else None
+        self._codes = self._map("codes.bin", np.int16, (self.capacity,))
+        self._free = np.flatnonzero(self._codes[:self.n_rows] < 0).tolist()
+
+    def refresh(self):
+        """Pick up writes made by another process (an ingest run) since the index was opened."""
+        try:
+            mtime = self._path("index.json").stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            with self._lock:
+                self._open()
+
+    def _save_index(self):
+        self._vectors.flush()
+        self._codes.flush()
+        if self._scales is not None:
+            self._scales.flush()
+        index = {"dtype": self.dtype, "dim": self.dim, "capacity": self.capacity,
+                 "n_rows": self.n_rows, "doc_types": self.doc_types}
+        tmp_path = self._path("index.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self._path("index.json"))
+        self._mtime = self._path("index.json").stat().st_mtime_ns
+
+    def _grow(self, needed: int):
+        """Extend the mapped files (rows keep their place, the files are row-major)."""
+        capacity = max(needed, self.capacity * 2, 1024)
+        files = [("vectors.bin", _DTYPES[self.dtype], (capacity, self.dim)), ("codes.bin", np.int16, (capacity,))]
+        if self.dtype == "int8":
+            files.append(("scales.bin", np.float32, (capacity,)))
+        self._vectors = self._scales = self._codes = None
+        for name, dtype, shape in files:
+            with open(self._path(name), "ab") as f:
+                f.truncate(int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        old_capacity, self.capacity = self.capacity, capacity
+        self._vectors = self._map("vectors.bin", _DTYPES[self.dtype], (capacity, self.dim))
+        self._scales = self._map("scales.bin", np.float32, (capacity,)) if self.dtype == "int8" else None
+        self._codes = self._map("codes.bin", np.int16, (capacity,))
+        self._codes[old_capacity:] = -1
+
+    def _code(self, doc_type: str) -> int:
+        if doc_type not in self.doc_types:
+            self.doc_types.append(doc_type)
+        return self.doc_types.index(doc_type)
+
+    # ------------------------------
+    # Writes
+    # ------------------------------
+    def upsert(self, ids: list, embeddings, documents: list = None, metadatas: list = None):
+        """Insert or replace chunks by ID (an ID repeated within the batch: the last copy wins)."""
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+        documents = documents or [""] * len(ids)
+        metadatas = [m or {} for m in (metadatas or [{}] * len(ids))]
+        last = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        if len(last) < len(ids):
+            keep = sorted(last.values())
+            ids = [ids[i] for i in keep]
+            vectors = vectors[keep]
+            documents = [documents[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+        with self._lock:
+            db = self._connect()
+            if not self.dim:
+                self.dim = vectors.shape[1]
+                self._grow(len(ids))
+            existing = {}
+            for marks, batch in _batches(list(ids)):
+                existing.update(db.execute(f"SELECT id, row FROM chunks WHERE id IN ({marks})", batch).fetchall())
+            rows = []
+            for chunk_id in ids:
+                if chunk_id in existing:
+                    rows.append(existing[chunk_id])
+                elif self._free:
+                    rows.append(self._free.pop())
+                else:
+                    rows.append(self.n_rows)
+                    self.n_rows += 1
+            if self.n_rows > self.capacity:
+                self._grow(self.n_rows)
+
+            rows = np.asarray(rows)
+            if self.dtype == "int8":
+                scales = np.abs(vectors).max(axis=1) / 127.0 + 1e-12
+                self._vectors[rows] = np.round(vectors / scales[:, None]).astype(np.int8)
+                self._scales[rows] = scales
+            else:
+                self._vectors[rows] = vectors.astype(np.float16)
+            doc_types = [str(m.get("doc_type", "")) for m in metadatas]
+            self._codes[rows] = [self._code(t) for t in doc_types]
+            db.executemany(
+                "INSERT OR REPLACE INTO chunks (row, id, doc_type, text, metadata) VALUES (?, ?, ?, ?, ?)",
+                [(int(row), chunk_id, doc_type, text, json.dumps(metadata))
+                 for row, chunk_id, doc_type, text, metadata in zip(rows, ids, doc_types, documents, metadatas)],
+            )
+            db.commit()
+            self._save_index()
+
+    def delete(self, ids: list):
+        if not ids or self._vectors is None:
+            return
+        with self._lock:
+            db = self._connect()
+            rows = []
+            for marks, batch in _batches(list(ids)):
+                rows.extend(row for (row,) in db.execute(f"SELECT row FROM chunks WHERE id IN ({marks})", batch))
+                db.execute(f"DELETE FROM chunks WHERE id IN ({marks})", batch)
+            db.commit()
+            self._codes[rows] = -1
+            self._free.extend(rows)
+            self._save_index()
+
+    # ------------------------------
+    # Reads
+    # ------------------------------
+    def count(self) -> int:
+        if self._codes is None:
+            return 0
+        return int((self._codes[:self.n_rows] >= 0).sum())
+
+    def dense(self, rows) -> np.ndarray:
+        """Dequantized float32 vectors of the given rows."""
+        return self._dequantize(self._vectors, self._scales, rows)
+
+    @staticmethod
+    def _dequantize(vectors, scales, rows) -> np.ndarray:
+        dense = np.asarray(vectors[rows], dtype=np.float32)
+        if scales is not None:
+            dense *= scales[rows][:, None]
+        return dense
+
+    def search(self, queries, k: int, doc_type: str = None, block_rows: int = 4096) -> tuple:
+        """
+        Exact top-k cosine search for a batch of query vectors.
+        :param queries: (n_queries, dim) or (dim,) array
+        :param doc_type: only rows of this doc_type are candidates (pre-filter)
+        :param block_rows: rows dequantized per step, bounds the float32 scratch memory
+        :return: (rows, scores), both (n_queries, <=k), best first
+        """
+        self.refresh()
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        queries = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + 1e-12)
+        if self._vectors is None or not self.n_rows:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+
+        # Only the candidate list and the array handles are taken under the lock; the
+        # scan runs outside it, so concurrent queries score in parallel (numpy drops the GIL)
+        with self._lock:
+            codes = self._codes[:self.n_rows]
+            if doc_type is None:
+                mask = codes >= 0
+            elif doc_type in self.doc_types:
+                mask = codes == self.doc_types.index(doc_type)
+            else:
+                mask = np.zeros(self.n_rows, dtype=bool)
+            candidates = np.flatnonzero(mask)
+            vectors, scales = self._vectors, self._scales
+        k = min(k, len(candidates))
+        if not k:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(candidates), block_rows):
+            rows = candidates[start:start + block_rows]
+            scores = self._dequantize(vectors, scales, rows) @ queries.T  # (block, n_queries)
+            rows = np.broadcast_to(rows[:, None], scores.shape)
+            scores = np.concatenate([best_scores, scores.T], axis=1)
+            rows = np.concatenate([best_rows, rows.T], axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if scores.shape[1] > k else \
+                np.broadcast_to(np.arange(scores.shape[1]), (len(queries), scores.shape[1]))
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def records(self, rows) -> list:
+        """(row, id, text, metadata) of the given rows, in the same order."""
+        rows = [int(row) for row in rows]
+        if not rows:
+            return []
+        found = {}
+        with self._lock:
+            for marks, batch in _batches(rows):
+                for row, chunk_id, text, metadata in self._connect().execute(
+                        f"SELECT row, id, text, metadata FROM chunks WHERE row IN ({marks})", batch):
+                    found[row] = (row, chunk_id, text, json.loads(metadata))
+        return [found[row] for row in rows if row in found]
+
+
+class NumpyCollection:
+    """
+    The subset of Chroma's Collection API the rest of the code calls through
+    `vectorstore._collection` (get, upsert, delete, count).
+    """
+
+    def __init__(self, index: NumpyIndex):
+        self.index = index
+
+    def count(self) -> int:
+        return self.index.count()
+
+    def upsert(self, ids: list, embeddings=None, documents: list = None, metadatas: list = None):
+        self.index.upsert(ids, embeddings, documents, metadatas)
+
+    def add(self, ids: list, embeddings=None, documents: list = None, metadatas: list = None):
+        self.index.upsert(ids, embeddings, documents, metadatas)
+
+    def delete(self, ids: list = None):
+        self.index.delete(ids or [])
+
+    def get(self, ids: list = None, where: dict = None, limit: int = None, offset: int = None,
+            include: Iterable = ("metadatas", "documents")) -> dict:
+        """
+        :param where: equality filter on metadata keys, e.g. {"doc_type": "policies"}
+        :return: {"ids", "embeddings", "documents", "metadatas"} (unrequested fields are None)
+        """
+        self.index.refresh()
+        db = self.index._connect()
+        if ids is not None and not ids:
+            return {"ids": [], "embeddings": None, "documents": None, "metadatas": None}
+        where = dict(where or {})
+        clauses, params = [], []
+        if "doc_type" in where:
+            clauses.append("doc_type = ?")
+            params.append(where.pop("doc_type"))
+
+        with self.index._lock:
+            if ids is None:
+                query = "SELECT row, id, text, metadata FROM chunks"
+                query += (" WHERE " + " AND ".join(clauses) if clauses else "") + " ORDER BY row"
+                rows = db.execute(query, params).fetchall()
+            else:
+                rows = []
+                for marks, batch in _batches(list(ids)):
+                    query = "SELECT row, id, text, metadata FROM chunks WHERE " + " AND ".join(
+                        [f"id IN ({marks})"] + clauses)
+                    rows.extend(db.execute(query, batch + params))
+                rows.sort()
+        records = [(row, chunk_id, text, json.loads(metadata)) for row, chunk_id, text, metadata in rows]
+        if where:
+            records = [r for r in records if all(r[3].get(key) == value for key, value in where.items())]
+        offset = offset or 0
+        records = records[offset:None if limit is None else offset + limit]
+        include = set(include)
+        rows = [r[0] for r in records]
+        return {
+            "ids": [r[1] for r in records],
+            "embeddings": self.index.dense(rows) if "embeddings" in include and rows else
+            (np.empty((0, self.index.dim), dtype=np.float32) if "embeddings" in include else None),
+            "documents": [r[2] for r in records] if "documents" in include else None,
+            "metadatas": [r[3] for r in records] if "metadatas" in include else None,
+        }
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    LangChain vector store on a NumpyIndex, a lighter alternative to Chroma for
+    corpora that fit a memory-mapped matrix (config.VECTOR_BACKEND = "numpy").
+    Supports the calls the chatbot makes on Chroma: similarity_search_by_vector()
+    with a {"doc_type": ...} filter, delete(ids=...), `embeddings` and `_collection`.
+    """
+
+    def __init__(self, persist_directory: str, embedding_function: Embeddings = None,
+                 dtype: str = config.NUMPY_STORE_DTYPE):
+        """
+        :param persist_directory: index folder
+        :param embedding_function: encoder for text queries and add_texts()
+        :param dtype: "float16" or "int8" storage for a new index
+        """
+        self._embedding = embedding_function
+        self._index = NumpyIndex(Path(persist_directory), dtype)
+        self._collection = NumpyCollection(self._index)
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: list = None, ids: list = None, **kwargs) -> list:
+        texts = list(texts)
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+        self._index.upsert(ids, self._embedding.embed_documents(texts), texts, metadatas)
+        return ids
+
+    def delete(self, ids: list = None, **kwargs):
+        self._index.delete(ids or [])
+
+    def _documents(self, rows, scores) -> list:
+        score_by_row = dict(zip(rows.tolist(), scores.tolist()))
+        return [(Document(id=chunk_id, page_content=text, metadata=metadata), score_by_row[row])
+                for row, chunk_id, text, metadata in self._index.records(rows)]
+
+    @staticmethod
+    def _doc_type(filter: dict = None) -> Optional[str]:
+        if filter and set(filter) - {"doc_type"}:
+            raise ValueError(f"NumpyVectorStore only filters on doc_type, got {filter}")
+        return (filter or {}).get("doc_type")
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, filter: dict = None) -> list:
+        rows, scores = self._index.search(embedding, k, doc_type=self._doc_type(filter))
+        return self._documents(rows[0], scores[0])
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter: dict = None, **kwargs) -> list:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_by_vectors(self, embeddings, k: int = 4, filter: dict = None) -> list:
+        """Batched search: one list of Documents per query vector."""
+        rows, scores = self._index.search(embeddings, k, doc_type=self._doc_type(filter))
+        return [[doc for doc, _ in self._documents(r, s)] for r, s in zip(rows, scores)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, **kwargs) -> list:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs) -> list:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0  # cosine similarity to [0, 1]
+
+    @classmethod
+    def from_texts(cls, texts: list, embedding: Embeddings, metadatas: list = None, ids: list = None,
+                   persist_directory: str = str(config.db_folder), **kwargs) -> "NumpyVectorStore":
+        store = cls(persist_directory, embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        return store
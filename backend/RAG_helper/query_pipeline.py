@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+from backend import config
+from backend.RAG_helper.collection_version import get_collection_version
+from backend.RAG_helper.context_budget import assemble_context
+from backend.RAG_helper.hybrid_retriever import BM25Index, reciprocal_rank_fusion
+from backend.RAG_helper.intent_router import IntentRouter, RouteResult
+from backend.utils.metrics import metrics
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+class QueryResult(NamedTuple):
+    vector: list
+    route: RouteResult
+
+
+class QueryPipeline:
+    """
+    Single query stage in front of the chains: the question is embedded once,
+    and that vector is used for intent scoring and for the doc_type-filtered
+    Chroma search. The vectorstore's embedding function memoizes query vectors,
+    so the retriever reuses the same encoding instead of running the encoder again.
+    In "hybrid" mode the dense results are fused with a BM25 keyword search
+    (reciprocal rank fusion), so exact identifiers and names are not missed.
+    Recent search results are memoized too, so the chunks looked up for the
+    answer cache are the ones the chain then answers from.
+    """
+
+    def __init__(
+            self,
+            vectorstore,
+            router: IntentRouter,
+            k: int = config.RETRIEVAL_K,
+            mode: str = config.RETRIEVAL_MODE,
+    ):
+        """
+        :param vectorstore: loaded Chroma store (VectorEmbedding().load_vector())
+        :param router: intent router built on the same vectorstore
+        :param k: number of chunks to retrieve
+        :param mode: "hybrid" (dense + BM25) or "dense"
+        """
+        self.vectorstore = vectorstore
+        self.embedding = vectorstore.embeddings
+        self.router = router
+        self.k = k
+        self.mode = mode
+        self._bm25 = BM25Index.load_or_build(vectorstore) if mode == "hybrid" else None
+        self._results = OrderedDict()
+        self._results_version = get_collection_version()
+        self._lock = threading.Lock()
+
+    def embed(self, question: str) -> list:
+        """The one encoder forward pass for a question."""
+        return self.embedding.embed_query(question)
+
+    def run(self, question: str) -> QueryResult:
+        """Embed the question and route it with that vector."""
+        vector = self.embed(question)
+        return QueryResult(vector, self.router.route(question, vector=vector))
+
+    async def arun(self, question: str, limiter=None) -> QueryResult:
+        """Async run(): encoding happens off the event loop, the LLM fallback is rate limited."""
+        vector = await asyncio.to_thread(self.embed, question)
+        return QueryResult(vector, await self.router.aroute(question, vector=vector, limiter=limiter))
+
+    def search(self, question: str, doc_type: str = None, vector: list = None) -> list[Document]:
+        """
+        Chroma search by vector (fused with BM25 in hybrid mode), restricted to one doc_type when given.
+        :param question: question text, only encoded when no vector is given
+        :param doc_type: doc_type metadata to filter on (None searches everything); when fewer
+            than RETRIEVAL_MIN_RESULTS chunks match, the rest is filled from a global search
+        :param vector: precomputed query embedding
+        :return: list of Documents
+        """
+        key = (question, doc_type)
+        version = get_collection_version()
+        with self._lock:
+            if version != self._results_version:
+                self._results.clear()
+                self._results_version = version
+                if self._bm25 is not None:
+                    self._bm25 = BM25Index.load_or_build(self.vectorstore)
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        start = time.perf_counter()
+        if vector is None:
+            vector = self.embed(question)
+        docs = self._search(question, doc_type, vector)
+        if doc_type and len(docs) < config.RETRIEVAL_MIN_RESULTS:
+            # Too little in this doc_type: top up from the whole collection
+            metrics.incr("retrieval_fallback_total", doc_type=doc_type)
+            seen = {doc.id or doc.page_content for doc in docs}
+            extra = [doc for doc in self._search(question, None, vector) if (doc.id or doc.page_content) not in seen]
+            docs = docs + extra[:self.k - len(docs)]
+        metrics.observe("stage_seconds", time.perf_counter() - start, stage="retrieval")
+
+        with self._lock:
+            self._results[key] = docs
+            if len(self._results) > config.RETRIEVAL_MEMO_SIZE:
+                self._results.popitem(last=False)
+        return docs
+
+    def _search(self, question: str, doc_type: str, vector: list) -> list[Document]:
+        bm25 = self._bm25
+        fetch_k = config.HYBRID_FETCH_K if bm25 is not None else self.k
+        search_filter = {"doc_type": doc_type} if doc_type else None
+
+        start = time.perf_counter()
+        dense = self.vectorstore.similarity_search_by_vector(vector, k=fetch_k, filter=search_filter)
+        metrics.observe("ranker_seconds", time.perf_counter() - start, ranker="dense")
+        if bm25 is None:
+            return dense
+
+        start = time.perf_counter()
+        sparse = [bm25.document(row) for row, _ in bm25.search(question, fetch_k, doc_type=doc_type)]
+        metrics.observe("ranker_seconds", time.perf_counter() - start, ranker="bm25")
+
+        by_id = {}
+        rankings = []
+        for ranked_docs in (dense, sparse):
+            ranking = []
+            for doc in ranked_docs:
+                doc_id = doc.id or doc.page_content
+                by_id.setdefault(doc_id, doc)
+                ranking.append(doc_id)
+            rankings.append(ranking)
+        return [by_id[doc_id] for doc_id, _ in reciprocal_rank_fusion(rankings)[:self.k]]
+
+    def as_retriever(self, doc_type: str = None) -> "PipelineRetriever":
+        return PipelineRetriever(pipeline=self, doc_type=doc_type)
+
+
+class PipelineRetriever(BaseRetriever):
+    """
+    LangChain retriever backed by QueryPipeline.search(), one per doc_type.
+    Results go through assemble_context() before they reach the prompt.
+    """
+
+    pipeline: Any
+    doc_type: Optional[str] = None
+
+    def _get_relevant_documents(
+            self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return assemble_context(self.pipeline.search(query, doc_type=self.doc_type))
+
+    async def _aget_relevant_documents(
+            self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        # Chroma is synchronous, keep it off the event loop
+        docs = await asyncio.to_thread(self.pipeline.search, query, self.doc_type)
+        return assemble_context(docs)
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from backend import config
+
+logger = logging.getLogger(__name__)
+
+
+def to_langchain_history(history):
+    """Convert Gradio "messages" history into LangChain chat messages."""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    messages = []
+    for msg in history or []:
+        if msg["role"] == "user":
+            messages.append(HumanMessage(content=msg["content"]))
+        elif msg["role"] == "assistant":
+            messages.append(AIMessage(content=msg["content"]))
+    return messages
+
+
+def build_summarizer():
+    """LLM chain folding conversation lines that left the memory window into a rolling summary."""
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import PromptTemplate
+    from backend.utils.ollama_client import get_chat_llm
+
+    prompt = PromptTemplate.from_template("""
+Progressively summarize the conversation between a user and the Oilwell Corporation assistant.
+Keep names, document numbers and facts the user may refer back to. Reply with the new summary only.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+New summary:
+""")
+    return prompt | get_chat_llm(temperature=0.0) | StrOutputParser()
+
+
+class SessionState:
+    """
+    Per-session windowed memory. The last `window_turns` turns are kept verbatim;
+    older messages are folded into a rolling summary, one evicted batch at a time.
+    The Gradio history is converted incrementally (only entries added since the
+    previous turn), so every turn does the same amount of work however long the
+    conversation gets.
+    """
+
+    def __init__(self, window_turns: int = config.MEMORY_WINDOW_TURNS):
+        self.window_turns = window_turns
+        self.window = deque()
+        self.evicted = []  # messages that left the window and are not summarized yet
+        self.summary = ""
+        self.n_seen = 0
+        self.last_content = None
+        self.lock = asyncio.Lock()  # one request at a time per session
+        self.summary_lock = asyncio.Lock()  # summary updates apply in order
+        self.summary_task = None
+        self.last_used = time.monotonic()
+
+    def _reset(self):
+        self.window.clear()
+        self.evicted = []
+        self.summary = ""
+        self.n_seen = 0
+
+    def sync(self, history) -> list:
+        """
+        :param history: full Gradio history of this session
+        :return: LangChain messages for this turn (summary first, then the window)
+        """
+        history = history or []
+        # Retry/undo/edit in the UI rewrites history: start over in that case
+        if len(history) < self.n_seen or (
+                self.n_seen and history[self.n_seen - 1]["content"] != self.last_content):
+            self._reset()
+
+        for message in to_langchain_history(history[self.n_seen:]):
+            self.window.append(message)
+            if len(self.window) > 2 * self.window_turns:
+                self.evicted.append(self.window.popleft())
+        self.n_seen = len(history)
+        self.last_content = history[-1]["content"] if history else None
+        self.last_used = time.monotonic()
+        return self.messages()
+
+    def messages(self) -> list:
+        from langchain_core.messages import SystemMessage
+
+        prefix = [SystemMessage(content=f"Summary of the earlier conversation: {self.summary}")] if self.summary else []
+        return prefix + list(self.window)
+
+    async def update_summary(self, summarizer, limiter=None):
+        """Fold the evicted messages into the rolling summary (one LLM call, off the answer path)."""
+        async with self.summary_lock:
+            if not self.evicted:
+                return
+            batch, self.evicted = self.evicted, []
+            new_lines = "\n".join(
+                f"{'User' if m.type == 'human' else 'Assistant'}: {m.content}" for m in batch
+            )
+            try:
+                async with limiter.slot() if limiter else nullcontext():
+                    self.summary = (await summarizer.ainvoke({
+                        "summary": self.summary or "(empty)",
+                        "new_lines": new_lines,
+                    })).strip()
+            except Exception as e:
+                # Keep the lines for the next attempt rather than losing them
+                self.evicted = batch + self.evicted
+                logger.warning("Summary update failed: %s", e)
+
+    def schedule_summary(self, summarizer, limiter=None):
+        """Start update_summary() in the background if messages are waiting to be summarized."""
+        if self.evicted and summarizer is not None:
+            self.summary_task = asyncio.create_task(self.update_summary(summarizer, limiter))
+
+
+class SessionStore:
+    """Bounded map of session id -> SessionState with idle expiry."""
+
+    def __init__(self, max_sessions: int = config.SESSION_MAX, ttl_seconds: float = config.SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> SessionState:
+        now = time.monotonic()
+        with self._lock:
+            state = self._sessions.pop(session_id, None)
+            # Drop idle sessions (least recently used first) and enforce the size bound
+            while self._sessions:
+                oldest_id, oldest = next(iter(self._sessions.items()))
+                if len(self._sessions) < self.max_sessions and now - oldest.last_used < self.ttl_seconds:
+                    break
+                del self._sessions[oldest_id]
+
+            state = state or SessionState()
+            state.last_used = now
+            self._sessions[session_id] = state
+            return state
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,130 @@
+import asyncio
+import queue
+import threading
+import time
+from backend.utils.metrics import metrics
+from langchain_core.callbacks import BaseCallbackHandler
+
+ANSWER_TAG = "answer"  # tag carried by the streaming LLM that writes the final answer
+
+_DONE = object()
+
+
+class TokenStreamHandler(BaseCallbackHandler):
+    """
+    Passes tokens of the answer LLM to `put` as they arrive and records
+    time-to-first-token and tokens/sec. Tokens of other LLM calls in the chain
+    (e.g. condensing the question) are ignored.
+    """
+
+    run_inline = True  # on the async path, call it on the event loop instead of an executor
+
+    def __init__(self, put, request_start: float = None):
+        """
+        :param put: callable receiving each token (a queue's put)
+        :param request_start: perf_counter() at request arrival, for time-to-first-token
+        """
+        self.put = put
+        self.request_start = request_start or time.perf_counter()
+        self.llm_start = None
+        self.first_token_at = None
+        self.n_tokens = 0
+        self.llm_calls = 0
+
+    def on_chat_model_start(self, serialized, messages, *, tags=None, **kwargs):
+        self.llm_calls += 1
+        if tags and ANSWER_TAG in tags:
+            self.llm_start = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, *, tags=None, **kwargs):
+        if tags and ANSWER_TAG not in tags:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.n_tokens += 1
+        self.put(token)
+
+    def record(self):
+        """Store the per-request streaming metrics once generation has finished."""
+        end = time.perf_counter()
+        if self.llm_start is not None:
+            metrics.observe("stage_seconds", end - self.llm_start, stage="generation")
+        if self.first_token_at is None:
+            return {"llm_calls": self.llm_calls}
+        ttft = self.first_token_at - self.request_start
+        stream_seconds = end - self.first_token_at
+        tokens_per_second = self.n_tokens / stream_seconds if stream_seconds > 0 else 0.0
+        metrics.observe("time_to_first_token_seconds", ttft)
+        metrics.observe("tokens_per_second", tokens_per_second)
+        metrics.observe("completion_tokens", self.n_tokens)
+        return {
+            "time_to_first_token": ttft,
+            "tokens": self.n_tokens,
+            "tokens_per_second": tokens_per_second,
+            "llm_calls": self.llm_calls,
+        }
+
+
+def stream_chain(chain, inputs: dict, request_start: float = None, callbacks: list = None):
+    """
+    Run a chain on a worker thread and yield answer tokens as they are generated.
+    The final item yielded is the chain's full result dict.
+    :param callbacks: extra callbacks for this run (metrics, sampled tracing)
+    """
+    tokens = queue.Queue()
+    handler = TokenStreamHandler(tokens.put, request_start)
+    outcome = {}
+
+    def worker():
+        try:
+            outcome["result"] = chain.invoke(inputs, config={"callbacks": [handler, *(callbacks or [])]})
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            tokens.put(_DONE)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    while True:
+        token = tokens.get()
+        if token is _DONE:
+            break
+        yield token
+    thread.join()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    result = outcome["result"]
+    result["stream_stats"] = handler.record()
+    yield result
+
+
+async def astream_chain(chain, inputs: dict, request_start: float = None, callbacks: list = None):
+    """
+    Async stream_chain(): runs chain.ainvoke() as a task and yields answer tokens
+    as they are generated, then the chain's full result dict.
+    """
+    loop = asyncio.get_running_loop()
+    tokens = asyncio.Queue()
+    # Callbacks may run on a worker thread, hand tokens back to the loop safely
+    handler = TokenStreamHandler(lambda token: loop.call_soon_threadsafe(tokens.put_nowait, token), request_start)
+
+    async def run():
+        try:
+            return await chain.ainvoke(inputs, config={"callbacks": [handler, *(callbacks or [])]})
+        finally:
+            loop.call_soon_threadsafe(tokens.put_nowait, _DONE)
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            token = await tokens.get()
+            if token is _DONE:
+                break
+            yield token
+        result = await task
+    finally:
+        if not task.done():
+            task.cancel()
+    result["stream_stats"] = handler.record()
+    yield result
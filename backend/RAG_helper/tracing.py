@@ -0,0 +1,107 @@
+import random
+import threading
+import time
+from backend import config
+from backend.utils.metrics import metrics
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Low-overhead LangChain callback recording into the shared metrics registry:
+    latency of every chain, LLM and retriever run (langchain_run_seconds{kind,name}),
+    run outcomes, and prompt/completion token usage reported by the LLM server.
+    Nothing is printed; one instance can be shared by all requests.
+    """
+
+    run_inline = True  # only dict updates, no need for an executor on the async path
+
+    def __init__(self):
+        self._runs = {}  # run_id -> (kind, name, start)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _name(serialized, kwargs) -> str:
+        if kwargs.get("name"):
+            return kwargs["name"]
+        serialized = serialized or {}
+        return serialized.get("name") or (serialized.get("id") or ["unknown"])[-1]
+
+    def _start(self, kind: str, serialized, run_id, kwargs):
+        with self._lock:
+            self._runs[run_id] = (kind, self._name(serialized, kwargs), time.perf_counter())
+
+    def _end(self, run_id, status: str = "ok"):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        kind, name, start = run
+        metrics.observe("langchain_run_seconds", time.perf_counter() - start, kind=kind, name=name)
+        metrics.incr("langchain_runs_total", kind=kind, name=name, status=status)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        self._start("chain", serialized, run_id, kwargs)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status="error")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start("llm", serialized, run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start("llm", serialized, run_id, kwargs)
+
+    @staticmethod
+    def _usage(response) -> dict:
+        """{"prompt": n, "completion": n} from llm_output, or from the message usage_metadata of streamed calls."""
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            return {kind: usage.get(f"{kind}_tokens") or 0 for kind in ("prompt", "completion")}
+        totals = {"prompt": 0, "completion": 0}
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                totals["prompt"] += metadata.get("input_tokens") or 0
+                totals["completion"] += metadata.get("output_tokens") or 0
+        return totals
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        for kind, tokens in self._usage(response).items():
+            if tokens:
+                metrics.incr("llm_tokens_total", tokens, type=kind)
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status="error")
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start("retriever", serialized, run_id, kwargs)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        metrics.observe("retrieved_documents", len(documents))
+        self._end(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status="error")
+
+
+metrics_handler = MetricsCallbackHandler()
+
+
+def request_callbacks(sample_rate: float = None) -> list:
+    """
+    Callbacks for one chat request: always the metrics handler, plus verbose
+    console tracing (full prompts and outputs) for a sampled fraction of requests.
+    :param sample_rate: share of requests traced verbosely, defaults to config.TRACE_SAMPLE_RATE
+    """
+    sample_rate = config.TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if sample_rate > 0 and random.random() < sample_rate:
+        from langchain_core.tracers import ConsoleCallbackHandler
+
+        metrics.incr("traced_requests_total")
+        return [metrics_handler, ConsoleCallbackHandler()]
+    return [metrics_handler]
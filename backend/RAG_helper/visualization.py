@@ -0,0 +1,148 @@
+import random
+import time
+from pathlib import Path
+import numpy as np
+from backend import config
+from backend.RAG_helper.collection_version import get_collection_version
+from backend.RAG_helper.doc_catalog import load_or_build_catalog
+
+PALETTE = ["blue", "green", "red", "orange", "purple", "cyan", "magenta", "brown"]
+
+
+def stratified_sample(vectorstore, per_type: int = config.VISUAL_SAMPLE_PER_TYPE, seed: int = 0) -> dict:
+    """
+    Draw up to `per_type` random chunks from every doc_type, so small categories
+    stay visible next to large ones. Only IDs are listed per doc_type; embeddings
+    and texts are fetched for the sampled chunks alone.
+    :return: {"ids", "embeddings", "documents", "doc_types"}
+    """
+    rng = random.Random(seed)
+    collection = vectorstore._collection
+    sample = {"ids": [], "embeddings": [], "documents": [], "doc_types": []}
+    for doc_type in sorted(load_or_build_catalog(vectorstore)["doc_types"]):
+        ids = collection.get(where={"doc_type": doc_type}, include=[])["ids"]
+        if not ids:
+            continue
+        picked = rng.sample(ids, min(per_type, len(ids)))
+        output = collection.get(ids=picked, include=["embeddings", "documents"])
+        sample["ids"].extend(output["ids"])
+        sample["embeddings"].extend(output["embeddings"])
+        sample["documents"].extend(output["documents"])
+        sample["doc_types"].extend([doc_type] * len(output["ids"]))
+    sample["embeddings"] = np.asarray(sample["embeddings"], dtype=np.float32)
+    return sample
+
+
+def pca(vectors: np.ndarray, n_components: int) -> np.ndarray:
+    """Exact PCA through an SVD of the centered matrix (fast for a few thousand rows)."""
+    centered = vectors - vectors.mean(axis=0)
+    _, _, components = np.linalg.svd(centered, full_matrices=False)
+    return centered @ components[:n_components].T
+
+
+def project(vectors: np.ndarray, method: str = "pca", seed: int = 0) -> np.ndarray:
+    """
+    3-D coordinates for the sampled vectors.
+    :param method: "pca" (linear, seconds even for large samples) or "tsne"
+        (t-SNE run on a 50-dimensional PCA reduction, slower but keeps local clusters)
+    """
+    if len(vectors) < 4:
+        return np.zeros((len(vectors), 3), dtype=np.float32)
+    if method == "pca":
+        return pca(vectors, 3)
+    if method == "tsne":
+        from sklearn.manifold import TSNE
+
+        reduced = pca(vectors, min(50, vectors.shape[1], len(vectors)))
+        perplexity = min(30.0, (len(vectors) - 1) / 3)
+        return TSNE(n_components=3, perplexity=perplexity, init="pca", random_state=seed).fit_transform(reduced)
+    raise ValueError(f"Unknown projection '{method}', expected 'pca' or 'tsne'")
+
+
+def cached_projection(
+        vectorstore,
+        method: str = "pca",
+        per_type: int = config.VISUAL_SAMPLE_PER_TYPE,
+        seed: int = 0,
+        cache_dir: Path = config.visual_cache_dir,
+) -> dict:
+    """
+    Sample and project, reusing coordinates computed earlier for the same
+    collection version, method, sample size and seed.
+    :return: {"coords", "doc_types", "documents"}
+    """
+    cache_path = Path(cache_dir) / f"{get_collection_version() or 'unversioned'}-{method}-{per_type}-{seed}.npz"
+    if cache_path.exists():
+        with np.load(cache_path, allow_pickle=False) as cached:
+            return {key: cached[key] for key in ("coords", "doc_types", "documents")}
+
+    sample = stratified_sample(vectorstore, per_type, seed)
+    projection = {
+        "coords": np.asarray(project(sample["embeddings"], method, seed), dtype=np.float32),
+        "doc_types": np.array(sample["doc_types"], dtype=str),
+        "documents": np.array([d[:100] for d in sample["documents"]], dtype=str),
+    }
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(cache_path, **projection)
+    return projection
+
+
+def write_plot(projection: dict, output: Path = config.visual_output_file, method: str = "pca") -> Path:
+    """Write a self-contained 3-D WebGL scatter plot (plotly.js inlined, opens without network or display)."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    doc_types = projection["doc_types"]
+    for i, doc_type in enumerate(sorted(set(doc_types.tolist()))):
+        mask = doc_types == doc_type
+        coords = projection["coords"][mask]
+        fig.add_trace(go.Scatter3d(
+            x=coords[:, 0],
+            y=coords[:, 1],
+            z=coords[:, 2],
+            mode="markers",
+            name=f"{doc_type} ({int(mask.sum())})",
+            marker=dict(size=3, color=PALETTE[i % len(PALETTE)], opacity=0.8),
+            text=[f"Type: {doc_type}<br>Text: {d}..." for d in projection["documents"][mask]],
+            hoverinfo="text",
+        ))
+    fig.update_layout(
+        title=f"3D Vector Store Visualization ({method.upper()}, {len(doc_types)} sampled chunks)",
+        scene=dict(xaxis_title="x", yaxis_title="y", zaxis_title="z"),
+        width=900,
+        height=700,
+        margin=dict(r=20, b=10, l=10, t=40),
+    )
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    fig.write_html(str(output), include_plotlyjs=True, full_html=True)
+    return output
+
+
+def visualize(
+        vectorstore,
+        method: str = "pca",
+        per_type: int = config.VISUAL_SAMPLE_PER_TYPE,
+        seed: int = 0,
+        output: Path = config.visual_output_file,
+) -> Path:
+    """Sample, project (cached per collection version) and write the HTML plot."""
+    start = time.perf_counter()
+    projection = cached_projection(vectorstore, method, per_type, seed)
+    path = write_plot(projection, output, method)
+    print(f"Plotted {len(projection['doc_types'])} chunks to {path} in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+    from backend.RAG_helper.embedding import VectorEmbedding
+
+    parser = argparse.ArgumentParser(description="Plot a stratified sample of the vector store")
+    parser.add_argument("--method", choices=["pca", "tsne"], default="pca")
+    parser.add_argument("--per-type", type=int, default=config.VISUAL_SAMPLE_PER_TYPE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=config.visual_output_file)
+    args = parser.parse_args()
+
+    visualize(VectorEmbedding().load_vector(), args.method, args.per_type, args.seed, args.output)
@@ -1,138 +1,389 @@
-import config
+from backend import config
 import gradio as gr
-from backend.RAG_helper.embedding import VectorEmbedding
-from backend.RAG_helper.prompt_manager import get_prompts
-from backend.RAG_helper.intent_classifier import (
-    get_doc_types,
-    build_intent_classifier,
-    detect_intent
-)
-from langchain_openai import ChatOpenAI
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationalRetrievalChain
-from langchain.schema import HumanMessage, AIMessage
-from langchain.callbacks import StdOutCallbackHandler
-from langchain.prompts import PromptTemplate
+from backend.RAG_helper.answer_cache import fingerprint_documents
+from backend.utils.request_limiter import QueueFullError
+from backend.utils.metrics import metrics
+from backend.utils.startup_timer import startup_stage, format_startup_report
+import asyncio
+import logging
+import threading
+import time
 import warnings
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
+logger = logging.getLogger(__name__)
 
 
 # --- Function to initialize system once ---
 def initialize_chatbot():
     """Initialize and return all persistent chatbot components."""
-    print("🔧 Initializing chatbot components...")
+    logger.info("Initializing chatbot components...")
+
+    # The RAG stack (LangChain, Chroma, torch) is imported here rather than at module
+    # load, so the Gradio app starts without it (chat() and achat() import the
+    # LangChain-based helpers they need once this has run)
+    with startup_stage("import"):
+        from backend.RAG_helper.streaming import ANSWER_TAG
+        from backend.RAG_helper.embedding import VectorEmbedding
+        from backend.RAG_helper.prompt_manager import get_prompts
+        from backend.RAG_helper.intent_classifier import build_intent_classifier
+        from backend.RAG_helper.intent_router import IntentRouter
+        from backend.RAG_helper.query_pipeline import QueryPipeline
+        from backend.RAG_helper.answer_cache import SemanticAnswerCache
+        from backend.RAG_helper.sessions import SessionStore, build_summarizer
+        from backend.utils.request_limiter import RequestLimiter
+        from backend.utils.ollama_client import get_chat_llm
+
+    # Encoder weights load in the background while the vectorstore is opened
+    # (nothing below encodes until the first question)
+    embedding = VectorEmbedding()
+    encoder_thread = threading.Thread(target=embedding.encoder.load, name="encoder-load", daemon=True)
+    encoder_thread.start()
 
     # Vectorstore
-    vectorstore = VectorEmbedding().load_vector()
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
-
-    # Dynamically extract document categories from metadata
-    doc_types = get_doc_types(vectorstore)
-    print(f"Found doc_type categories: {doc_types}")
-
-    # Build LLM intent classifier using those doc_types
-    intent_chain = build_intent_classifier(doc_types)
-
-    # LLM
-    llm = ChatOpenAI(
-        base_url="http://localhost:11434/v1",
-        api_key="ollama",
-        model=config.MODEL,
-        temperature=0.7,
-    )
+    vectorstore = embedding.load_vector()
 
-    # Memory
-    chat_history = ChatMessageHistory()
-    memory = ConversationBufferMemory(
-        memory_key="chat_history",
-        chat_memory=chat_history,
-        return_messages=True,
-        output_key="answer"
-    )
+    with startup_stage("classifier_build"):
+        # Rule/embedding router; the ingest catalog it reads also yields the document categories
+        router = IntentRouter(vectorstore)
+        doc_types = router.doc_types
+        logger.info("Found doc_type categories: %s", doc_types)
+
+        # LLM intent classifier, only used when the router is unsure
+        intent_chain = build_intent_classifier(doc_types)
+        router.intent_chain = intent_chain
+
+    # One embedding pass per question serves routing and retrieval
+    with startup_stage("retriever_build"):
+        pipeline = QueryPipeline(vectorstore, router)
+
+    # LLM: the answer LLM streams tokens, the one condensing follow-up questions does not
+    # (stream_usage asks the server for a final usage chunk, or streamed calls report no tokens)
+    llm = get_chat_llm(temperature=0.7, streaming=True, stream_usage=True, tags=[ANSWER_TAG])
+    condense_llm = get_chat_llm(temperature=0.7)
 
     # Prompt templates
     prompts = get_prompts()
 
-    print("Chatbot initialized successfully!")
+    # One stateless chain per intent, shared by every session
+    with startup_stage("chain_build"):
+        chains = build_chains(llm, condense_llm, pipeline, prompts)
+
+    encoder_thread.join()
+    logger.info("Chatbot initialized successfully!")
+    logger.info(format_startup_report())
 
     return {
-        "retriever": retriever,
+        "pipeline": pipeline,
+        "answer_cache": SemanticAnswerCache(),
+        "limiter": RequestLimiter(),
+        "sessions": SessionStore(),
+        "summarizer": build_summarizer(),
         "llm": llm,
-        "memory": memory,
         "prompts": prompts,
+        "chains": chains,
         "intent_chain": intent_chain,
+        "router": router,
         "doc_types": doc_types
     }
 
 
+def build_chains(llm, condense_llm, pipeline, prompts):
+    """
+    Build one ConversationalRetrievalChain per intent: every doc_type plus "general".
+    A doc_type chain uses the prompt named after the singular or plural form of the
+    doc_type ("policies" -> "policy"), else the general prompt, and retrieves
+    through the query pipeline filtered to that doc_type (RETRIEVAL_FILTER_BY_INTENT),
+    so only the matching part of the collection is searched and passed to the LLM.
+    The chains hold no memory: chat history is passed in on every call,
+    so the same chain objects can serve concurrent sessions. Callbacks
+    (metrics, sampled tracing) are passed per request as well.
+    """
+    from backend.RAG_helper.condense import CondenseQuestionChain
+    from backend.RAG_helper.intent_router import word_forms
+    from langchain.chains import ConversationalRetrievalChain
+
+    doc_types = [t for t in pipeline.router.doc_types if t != "general"]
+    # Shared rewriter: skips standalone questions and memoizes rewrites across chains
+    condenser = CondenseQuestionChain.from_llm(condense_llm)
+    chains = {}
+    for name in ["general", *doc_types]:
+        prompt_key = next((form for form in word_forms(name) if form in prompts), "general")
+        # With RETRIEVAL_FILTER_BY_INTENT the search is restricted to the intent's doc_type
+        doc_type = name if name in doc_types and config.RETRIEVAL_FILTER_BY_INTENT else None
+        chain = ConversationalRetrievalChain.from_llm(
+            llm=llm,
+            retriever=pipeline.as_retriever(doc_type=doc_type),
+            combine_docs_chain_kwargs={"prompt": prompts[prompt_key]},
+            return_source_documents=True
+        )
+        chain.question_generator = condenser
+        chains[name] = chain
+    return chains
+
+
+def record_request(route, request_start: float, result: dict = None, prompt_tokens: int = 0) -> dict:
+    """
+    Per-request metrics: end-to-end latency (request_seconds{cache}), LLM generations
+    the message cost (intent fallback, condense and answer) and the streaming stats.
+    :param result: chain result with "stream_stats", None for an answer cache hit
+    """
+    cache = "miss" if result else "hit"
+    stats = dict(result["stream_stats"]) if result else {}
+    stats["llm_calls"] = (route.path == "llm") + stats.get("llm_calls", 0)
+    stats["seconds"] = time.perf_counter() - request_start
+    metrics.observe("request_seconds", stats["seconds"], cache=cache)
+    # A served request proves what the warm-up may have failed to (e.g. Ollama was down at launch)
+    _readiness["retrieval"] = True
+    if result:
+        _readiness["llm"] = True
+    metrics.observe("llm_calls_per_message", stats["llm_calls"])
+    logger.info("Answered in %.2fs: intent %s via %s, cache %s, %d LLM calls, %d tokens, ~%d prompt tokens",
+                stats["seconds"], route.intent, route.path, cache, stats["llm_calls"],
+                stats.get("tokens", 0), prompt_tokens)
+    return stats
+
+
 # --- Cache initialization (so it runs only once) ---
 _chatbot_components = None
+_init_lock = threading.Lock()
+_readiness = {"components": False, "retrieval": False, "llm": False}
 
 
 def get_chatbot_components():
     global _chatbot_components
     if _chatbot_components is None:
-        _chatbot_components = initialize_chatbot()
+        # Concurrent first requests wait for the one initialization instead of starting their own
+        with _init_lock:
+            if _chatbot_components is None:
+                _chatbot_components = initialize_chatbot()
+                _readiness["components"] = True
     return _chatbot_components
 
 
+def warm_up(retry: bool = False):
+    """
+    Initialize the components eagerly and exercise the cold paths once:
+    a dummy embedding and retrieval (encoder, Chroma, BM25) and a ping that
+    makes Ollama load the model. Readiness is reported by is_ready(); a
+    successful chat request also marks its parts ready (see record_request()).
+    :param retry: repeat the failed steps with exponential backoff
+        (WARMUP_RETRY_SECONDS up to WARMUP_RETRY_MAX_SECONDS) until all succeed
+    """
+    from backend.utils.ollama_client import preload_model
+
+    start = time.perf_counter()
+    delay = config.WARMUP_RETRY_SECONDS
+    while True:
+        try:
+            pipeline = get_chatbot_components()["pipeline"]
+            if not _readiness["retrieval"]:
+                with startup_stage("warmup_retrieval"):
+                    vector = pipeline.embed(config.WARMUP_QUESTION)
+                    pipeline.search(config.WARMUP_QUESTION, vector=vector)
+                _readiness["retrieval"] = True
+        except Exception as e:
+            logger.warning("Warm-up retrieval failed: %s", e)
+        if not _readiness["llm"]:
+            try:
+                with startup_stage("warmup_llm"):
+                    preload_model()
+                _readiness["llm"] = True
+            except Exception as e:
+                logger.warning("Warm-up could not reach the Ollama model %s: %s", config.MODEL, e)
+        if is_ready() or not retry:
+            break
+        logger.info("Warm-up incomplete (%s), retrying in %.0fs", readiness(), delay)
+        time.sleep(delay)
+        delay = min(delay * 2, config.WARMUP_RETRY_MAX_SECONDS)
+    logger.info("Warm-up finished in %.2fs, ready: %s", time.perf_counter() - start, is_ready())
+    return is_ready()
+
+
+def is_ready() -> bool:
+    return all(_readiness.values())
+
+
+def readiness() -> dict:
+    return {"ready": is_ready(), **_readiness}
+
+
+def format_sources(docs) -> str:
+    """List the distinct source files an answer was built from."""
+    sources = []
+    for doc in docs or []:
+        source = doc.metadata.get("source")
+        if source and source not in sources:
+            sources.append(source)
+    if not sources:
+        return ""
+    return "\n\n**Sources:**\n" + "\n".join(f"- {source}" for source in sources)
+
+
 # --- Chat handler ---
 def chat(message, history):
     """
     Handle chat with LangChain + Gradio integration.
     Gradio format: [{"role": "user", "content": ...}, {"role": "assistant", "content": ...}]
+    Generator: yields the answer as it streams in, then the answer with its sources.
     """
+    request_start = time.perf_counter()
     components = get_chatbot_components()
+    from backend.RAG_helper.context_budget import fit_history, record_prompt_tokens
+    from backend.RAG_helper.sessions import to_langchain_history
+    from backend.RAG_helper.streaming import stream_chain
+    from backend.RAG_helper.tracing import request_callbacks
 
-    retriever = components["retriever"]
-    llm = components["llm"]
-    memory = components["memory"]
-    prompts = components["prompts"]
-    intent_chain = components["intent_chain"]
-    doc_types = components["doc_types"]
-
-    # Sync Gradio history with LangChain memory
-    memory.chat_memory.clear()
-    if history:
-        for msg in history:
-            if msg["role"] == "user":
-                memory.chat_memory.add_message(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                memory.chat_memory.add_message(AIMessage(content=msg["content"]))
+    chains = components["chains"]
+    pipeline = components["pipeline"]
+    answer_cache = components["answer_cache"]
 
     # --- Detect user intent dynamically ---
-    intent = detect_intent(message, intent_chain, doc_types)
-    print(f"Detected intent: {intent}")
-
-    # --- Pick appropriate prompt ---
-    prompt = prompts.get(intent, prompts["general"])
-
-    # --- Build a Conversational Retrieval Chain ---
-    chain = ConversationalRetrievalChain.from_llm(
-        llm=llm,
-        retriever=retriever,
-        memory=memory,
-        combine_docs_chain_kwargs={"prompt": prompt},
-        callbacks=[StdOutCallbackHandler()],
-        return_source_documents=True
-    )
+    query = pipeline.run(message)
+    route = query.route
+    intent = route.intent
+    logger.debug("Detected intent: %s (via %s, confidence %.2f)", intent, route.path, route.confidence)
+
+    # --- Pick the prebuilt chain for this intent ---
+    chain = chains.get(intent, chains["general"])
+
+    # --- Answer cache: only first-turn questions, follow-ups depend on history ---
+    cacheable = not history
+    if cacheable:
+        docs = pipeline.search(message, doc_type=chain.retriever.doc_type, vector=query.vector)
+        fingerprint = fingerprint_documents(docs)
+        cached = answer_cache.lookup(query.vector, intent, fingerprint)
+        if cached:
+            record_request(route, request_start)
+            yield cached["answer"] + format_sources(cached["sources"])
+            return
+
+    # --- Stream the answer (history is per call, no shared state is touched) ---
+    # No session state on this path: keep the memory window, drop older turns
+    window = history[-2 * config.MEMORY_WINDOW_TURNS:] if history else []
+    chat_history = fit_history(to_langchain_history(window))
+    answer = ""
+    result = None
+    for item in stream_chain(chain, {
+        "question": message,
+        "chat_history": chat_history
+    }, request_start=request_start, callbacks=request_callbacks()):
+        if isinstance(item, dict):
+            result = item
+        else:
+            answer += item
+            yield answer
+
+    prompt_tokens = record_prompt_tokens(message, result["source_documents"], chat_history)
+    record_request(route, request_start, result, prompt_tokens)
+    if cacheable:
+        answer_cache.store(query.vector, intent, fingerprint, result["answer"], result["source_documents"])
+    yield result["answer"] + format_sources(result["source_documents"])
+
+
+# --- Async chat handler ---
+async def achat(message, history, request: gr.Request = None):
+    """
+    Asyncio chat path used by the Gradio app.
+    LLM calls go through the shared RequestLimiter (bounded concurrency and queue),
+    and every Gradio session gets its own SessionState, so concurrent users
+    never share conversation state.
+    """
+    request_start = time.perf_counter()
+    components = _chatbot_components or await asyncio.to_thread(get_chatbot_components)
+    from backend.RAG_helper.context_budget import fit_history, record_prompt_tokens
+    from backend.RAG_helper.streaming import astream_chain
+    from backend.RAG_helper.tracing import request_callbacks
+
+    chains = components["chains"]
+    pipeline = components["pipeline"]
+    answer_cache = components["answer_cache"]
+    limiter = components["limiter"]
+    session = components["sessions"].get(request.session_hash if request else "default")
+
+    async with session.lock:
+        chat_history = fit_history(session.sync(history))
+        try:
+            # --- Detect user intent (LLM fallback waits for a slot) ---
+            query = await pipeline.arun(message, limiter=limiter)
+            intent = query.route.intent
+            logger.debug("Detected intent: %s (via %s, confidence %.2f)",
+                         intent, query.route.path, query.route.confidence)
+            chain = chains.get(intent, chains["general"])
 
-    # --- Generate answer ---
-    result = chain.invoke({"question": message})
-    return result["answer"]
+            # --- Answer cache: only first-turn questions, follow-ups depend on history ---
+            cacheable = not history
+            if cacheable:
+                docs = await asyncio.to_thread(pipeline.search, message, chain.retriever.doc_type, query.vector)
+                fingerprint = fingerprint_documents(docs)
+                cached = answer_cache.lookup(query.vector, intent, fingerprint)
+                if cached:
+                    record_request(query.route, request_start)
+                    yield cached["answer"] + format_sources(cached["sources"])
+                    return
+
+            # --- Stream the answer once the LLM server has a free slot ---
+            answer = ""
+            result = None
+            async with limiter.slot():
+                async for item in astream_chain(chain, {
+                    "question": message,
+                    "chat_history": chat_history
+                }, request_start=request_start, callbacks=request_callbacks()):
+                    if isinstance(item, dict):
+                        result = item
+                    else:
+                        answer += item
+                        yield answer
+        except QueueFullError:
+            raise gr.Error("The assistant is busy right now, please try again in a moment.")
+
+    prompt_tokens = record_prompt_tokens(message, result["source_documents"], chat_history)
+    record_request(query.route, request_start, result, prompt_tokens)
+    session.schedule_summary(components["summarizer"], limiter)
+    if cacheable:
+        answer_cache.store(query.vector, intent, fingerprint, result["answer"], result["source_documents"])
+    yield result["answer"] + format_sources(result["source_documents"])
 
 
 # --- Gradio launch ---
-def gradio_view():
+def build_app():
+    """Gradio chat UI mounted on a FastAPI app that also serves /ready and /metrics."""
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse, PlainTextResponse
+
     demo = gr.ChatInterface(
-        fn=chat,
+        fn=achat,
         type="messages",
         title="🛢️ Oilwell Corporation Chatbot",
         description="Ask questions about Oilwell's people, products, and documentation",
     )
-    demo.launch(inbrowser=True)
+    # Gradio may run many handlers at once; the RequestLimiter bounds what reaches Ollama
+    demo.queue(default_concurrency_limit=config.LLM_MAX_QUEUE + config.LLM_MAX_CONCURRENCY)
+
+    app = FastAPI()
+
+    @app.get("/ready")
+    def ready():
+        # 503 until warm-up has finished, so load balancers hold traffic back
+        return JSONResponse(readiness(), status_code=200 if is_ready() else 503)
+
+    @app.get("/metrics")
+    def prometheus_metrics():
+        return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    return gr.mount_gradio_app(app, demo, path="/")
+
+
+def gradio_view():
+    import uvicorn
+
+    logging.basicConfig(level=config.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # The server starts answering (and reporting not ready) while the warm-up runs
+    threading.Thread(target=warm_up, kwargs={"retry": True}, name="warm-up", daemon=True).start()
+    logger.info("Serving on http://%s:%s (readiness at /ready, metrics at /metrics)",
+                config.SERVER_HOST, config.SERVER_PORT)
+    uvicorn.run(build_app(), host=config.SERVER_HOST, port=config.SERVER_PORT)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,93 @@
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
 
 MODEL = "llama3.2:latest"
 # MODEL_INSTRUCT = "llama-3.2"
 ENCODER_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 db_folder = Path(__file__).resolve().parent / "vector_db"
+db_version_file = Path(__file__).resolve().parent / "vector_db.version"
+bm25_file = Path(__file__).resolve().parent / "vector_db.bm25.pkl"
+manifest_file = Path(__file__).resolve().parent / "vector_db.manifest.json"
+catalog_file = Path(__file__).resolve().parent / "vector_db.catalog.json"
+visual_cache_dir = Path(__file__).resolve().parent / "vector_db.visual"
+visual_output_file = Path(__file__).resolve().parent / "vector_db.visual.html"
+embedding_cache_dir = Path(__file__).resolve().parent / "embedding_cache"
 doc_path = Path(__file__).resolve().parent / "utils" / "generated_docs"
-llama_base_url = "http://localhost:11434/v1"
+ollama_host = "http://localhost:11434"
+llama_base_url = f"{ollama_host}/v1"
+
+# Intent routing: the LLM classifier is only called when the embedding router is unsure
+INTENT_MARGIN = 0.05  # minimum gap between the two best doc_type centroid scores
+INTENT_MIN_SCORE = 0.2  # minimum cosine score of the best centroid
+INTENT_KEYWORDS = {}  # extra rule keywords, e.g. {"hr": "employees"}
+
+# Vector store backend
+VECTOR_BACKEND = "chroma"  # "chroma", or "numpy": memory-mapped matrix + SQLite metadata (numpy_store.py)
+NUMPY_STORE_DTYPE = "float16"  # "float16" (2x smaller than float32) or "int8" (4x smaller, faster scan, slightly lossy)
+# Both backends persist in db_folder: re-run ingestion after switching
+
+# Retrieval
+RETRIEVAL_K = 3
+RETRIEVAL_FILTER_BY_INTENT = True  # search only the doc_type of the detected intent
+RETRIEVAL_MIN_RESULTS = 2  # below this many filtered hits, fill up from a global search
+RETRIEVAL_MODE = "hybrid"  # "hybrid": dense + BM25 fused with reciprocal rank fusion, "dense": Chroma only
+HYBRID_FETCH_K = 10  # candidates taken from each ranker before fusion
+RRF_K = 60  # reciprocal rank fusion constant
+QUERY_EMBEDDING_MEMO_SIZE = 256  # recent query vectors shared by routing and retrieval
+RETRIEVAL_MEMO_SIZE = 256  # recent (question, doc_type) search results
+
+# Semantic answer cache
+ANSWER_CACHE_MAX_ENTRIES = 1000
+ANSWER_CACHE_TTL_SECONDS = 3600
+ANSWER_CACHE_SIMILARITY = 0.95  # cosine similarity for two questions to count as the same
+
+# Ingestion
+CHUNK_SIZE = 860
+CHUNK_OVERLAP = 150
+LOAD_WORKERS = 8  # threads opening files in Chunker.load_documents() (1 = serial)
+LOAD_PARALLEL = "file"  # "file": files load concurrently, "folder": one doc_type folder per worker
+EMBEDDING_CACHE_MAX_ENTRIES = 500_000  # chunk vectors kept on disk (about 0.75 GB at 384 dims)
+ENCODE_BATCH_SIZE = 64  # sentences per encoder forward pass
+INGEST_BATCH_SIZE = 512  # chunks per encode call and per vector DB write
+INGEST_WORKERS = 4  # processes reading and chunking files (0 = in-process)
+VISUAL_SAMPLE_PER_TYPE = 1000  # chunks per doc_type plotted by visual_rep()
+
+# Serving
+LLM_MAX_CONCURRENCY = 4  # LLM calls sent to Ollama at the same time
+LLM_MAX_QUEUE = 32  # requests allowed to wait for a slot before new ones are rejected
+SESSION_MAX = 1000  # chat sessions kept in memory
+SESSION_TTL_SECONDS = 3600  # idle time after which a session is dropped
+MEMORY_WINDOW_TURNS = 4  # turns kept verbatim per session, older ones live in a rolling summary
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 7860
+WARMUP_QUESTION = "What are the company policies?"  # dummy query run once at launch
+WARMUP_RETRY_SECONDS = 5  # first delay before a failed warm-up step is retried, doubled every attempt
+WARMUP_RETRY_MAX_SECONDS = 60
+OLLAMA_KEEP_ALIVE = "30m"  # how long Ollama keeps the model loaded after the warm-up ping
+LOG_LEVEL = "INFO"
+TRACE_SAMPLE_RATE = 0.0  # share of chat requests traced verbosely (full prompts) to the console
+
+# Condense-question step: skipped for standalone questions, memoized otherwise
+CONDENSE_MIN_WORDS = 4  # shorter follow-ups ("and his email?") are always rewritten
+CONDENSE_REFERRING_WORDS = {
+    "it", "its", "they", "them", "their", "he", "him", "his", "she", "her", "hers",
+    "this", "that", "these", "those", "there", "former", "latter", "above",
+    "previous", "same", "else", "another", "other", "one", "ones", "also",
+}
+CONDENSE_MEMO_SIZE = 512
+
+# Ollama HTTP clients (shared by every LLM consumer)
+HTTP_MAX_CONNECTIONS = 16  # pooled keep-alive connections to the Ollama server
+HTTP_KEEPALIVE_SECONDS = 120
+LLM_TIMEOUT_SECONDS = 300  # generation can be slow on CPU
+LLM_CONNECT_TIMEOUT_SECONDS = 5
+LLM_MAX_RETRIES = 3  # retried in one layer: the OpenAI SDK for chat, with_retries() for native calls
+LLM_RETRY_BACKOFF_SECONDS = 0.5  # first retry delay, doubled on every attempt
+GENERATION_WORKERS = 4  # synthetic documents generated concurrently by DocumentGenerator
+
+# Context budget (tokens are estimated as characters / CHARS_PER_TOKEN)
+CHARS_PER_TOKEN = 4
+CONTEXT_TOKEN_BUDGET = 1200  # retrieved chunks in the answer prompt
+HISTORY_TOKEN_BUDGET = 600  # chat history in the answer prompt
+CONTEXT_MIN_PARTIAL_TOKENS = 50  # smallest truncated chunk/message worth keeping
+CONTEXT_DUPLICATE_THRESHOLD = 0.8  # word 3-gram Jaccard above which a chunk is a near-duplicate
+PROMPT_TEMPLATE_TOKENS = 60  # fixed instructions of the prompt_manager templates
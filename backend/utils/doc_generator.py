@@ -1,6 +1,8 @@
 from backend import config
+from backend.utils.ollama_client import get_ollama_client, with_retries
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
-import ollama
+import time
 
 
 class DocumentGenerator:
@@ -18,8 +20,9 @@ class DocumentGenerator:
     # Core Ollama Integration
     # ------------------------------
     def generate_document(self, prompt: str) -> str:
-        """Generate text from a prompt using Ollama."""
-        response = ollama.generate(
+        """Generate text from a prompt using the shared, pooled Ollama client."""
+        response = with_retries(
+            get_ollama_client().generate,
             model=self.model,
             prompt=prompt,
             options={"temperature": self.temperature, "num_predict": self.num_predict}
@@ -45,6 +48,39 @@ class DocumentGenerator:
     # ------------------------------
     # Document Generation
     # ------------------------------
+    @staticmethod
+    def document_name(item: dict, i: int) -> str:
+        """Determine a name for the document (employee_name, product_type, etc.)"""
+        return (
+                item.get("employee_name")
+                or item.get("product_type")
+                or item.get("title")
+                or item.get("name")
+                or f"Document_{i}"
+        )
+
+    @staticmethod
+    def write_atomic(filename: str, text: str):
+        """Write to a temp file and rename it, so an interrupted run never leaves a partial document."""
+        tmp_name = f"{filename}.tmp"
+        with open(tmp_name, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_name, filename)
+
+    def _generate_one(self, i: int, item: dict, template: str, filename: str, header_template: str = None):
+        # Fill in template
+        prompt = self.fill_template(template, item)
+        content = self.generate_document(prompt)
+
+        # Create header if provided (numbered by position in data_list, not completion order)
+        header = ""
+        if header_template:
+            header = header_template.format(doc_number=1000 + i)
+
+        # Save to markdown file
+        self.write_atomic(filename, header + content)
+        return filename
+
     def process_documents(
             self,
             template: str,
@@ -52,40 +88,59 @@ class DocumentGenerator:
             doc_type: str = "generic",
             base_output_dir: str = "./generated_docs",
             header_template: str = None,
+            workers: int = config.GENERATION_WORKERS,
+            resume: bool = False,
     ):
-        """Generate multiple documents and save them under a type-specific folder."""
+        """
+        Generate multiple documents and save them under a type-specific folder.
+        A failed document is reported and skipped; the others keep going.
+        :param workers: number of documents generated concurrently (Ollama requests in flight)
+        :param resume: skip documents whose file already exists from an earlier run
+            (failed documents have no file, so a resumed run retries them)
+        :return: (index, name, error) of every document that failed
+        """
         output_dir = os.path.join(base_output_dir, doc_type.lower())
         os.makedirs(output_dir, exist_ok=True)
 
+        jobs = []
         for i, item in enumerate(data_list, 1):
-            # Determine a name for the document (employee_name, product_type, etc.)
-            name_key = (
-                    item.get("employee_name")
-                    or item.get("product_type")
-                    or item.get("title")
-                    or item.get("name")
-                    or f"Document_{i}"
-            )
-
-            print(f"[{i}/{len(data_list)}] Generating {doc_type} file for {name_key}")
-
-            # Fill in template
-            prompt = self.fill_template(template, item)
-            content = self.generate_document(prompt)
-
-            # Create header if provided
-            header = ""
-            if header_template:
-                header = header_template.format(doc_number=1000 + i)
-
-            # Save to markdown file
+            name_key = self.document_name(item, i)
             filename = os.path.join(output_dir, f"{self.safe_filename(name_key)}.md")
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write(header + content)
-
-            print(f"✓ Saved: {filename}")
-
-        print(f"\n✓ Done! All {doc_type} files saved in: {output_dir}\n")
+            if resume and os.path.exists(filename):
+                print(f"[{i}/{len(data_list)}] Skipping {doc_type} file for {name_key} (already exists)")
+                continue
+            jobs.append((i, item, filename))
+
+        start = time.perf_counter()
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {}
+            for i, item, filename in jobs:
+                print(f"[{i}/{len(data_list)}] Queued {doc_type} file for {self.document_name(item, i)}")
+                future = pool.submit(self._generate_one, i, item, template, filename, header_template)
+                futures[future] = (i, self.document_name(item, i))
+
+            for done, future in enumerate(as_completed(futures), 1):
+                elapsed = time.perf_counter() - start
+                rate = (done - len(failed)) / elapsed * 60 if elapsed else 0.0
+                try:
+                    filename = future.result()
+                except Exception as e:
+                    i, name_key = futures[future]
+                    failed.append((i, name_key, str(e)))
+                    print(f"✗ Failed: [{i}/{len(data_list)}] {name_key}: {e} ({done}/{len(jobs)})")
+                    continue
+                print(f"✓ Saved: {filename} ({done}/{len(jobs)}, {rate:.1f} docs/min)")
+
+        print(f"\n✓ Done! {doc_type} files saved in: {output_dir} "
+              f"({len(jobs) - len(failed)} generated, {len(failed)} failed, {len(data_list) - len(jobs)} skipped, "
+              f"{time.perf_counter() - start:.1f}s)")
+        for i, name_key, error in failed:
+            print(f"  ✗ [{i}] {name_key}: {error}")
+        if failed:
+            print("Re-run with resume=True to retry the failed documents.")
+        print()
+        return failed
 
     # ------------------------------
     # Convenience Entry Point
@@ -104,14 +159,18 @@ class DocumentGenerator:
             ---
         
         """,
+            workers: int = config.GENERATION_WORKERS,
+            resume: bool = False,
     ):
-        """Simplified entrypoint for document generation."""
-        self.process_documents(
+        """Simplified entrypoint for document generation (returns the failed documents)."""
+        return self.process_documents(
             template=template,
             data_list=data_list,
             doc_type=doc_type,
             base_output_dir=base_output_dir,
             header_template=header_template,
+            workers=workers,
+            resume=resume,
         )
 
 
@@ -0,0 +1,131 @@
+import math
+import re
+import threading
+from collections import defaultdict, deque
+
+# Histogram bucket upper bounds: latencies (series ending in _seconds) and sizes/counts
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, math.inf)
+
+
+class Metrics:
+    """
+    Small in-process registry of counters and latency observations.
+    Every component records into the shared `metrics` instance below so the
+    numbers can be inspected from one place.
+    Observations feed both a window of recent samples (for percentiles) and a
+    cumulative histogram (for the Prometheus endpoint).
+    """
+
+    def __init__(self, max_samples: int = 2048):
+        """
+        :param max_samples: how many recent observations to keep per series
+        """
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._histograms = {}  # key -> [bucket counts, count, sum]
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def incr(self, name: str, value: float = 1, **labels):
+        """Increase a counter, e.g. metrics.incr("intent_route_total", path="embedding")."""
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge to its current value, e.g. a queue depth."""
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def gauge(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._gauges.get(self._key(name, labels), 0)
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation (usually a latency in seconds)."""
+        key = self._key(name, labels)
+        buckets = LATENCY_BUCKETS if name.endswith("_seconds") else SIZE_BUCKETS
+        with self._lock:
+            self._samples[key].append(value)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(buckets), 0, 0.0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += 1
+            histogram[2] += value
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0)
+
+    def samples(self, name: str, **labels) -> list:
+        with self._lock:
+            return list(self._samples.get(self._key(name, labels), ()))
+
+    def snapshot(self) -> dict:
+        """Return a plain copy of all counters, gauges and samples."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "samples": {k: list(v) for k, v in self._samples.items()},
+                "histograms": {k: (list(h[0]), h[1], h[2]) for k, h in self._histograms.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._samples.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """All series in the Prometheus text exposition format (counters, gauges, histograms)."""
+        snapshot = self.snapshot()
+        lines, typed = [], set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {_metric_name(name)} {kind}")
+
+        for (name, labels), value in sorted(snapshot["counters"].items()):
+            declare(name, "counter")
+            lines.append(f"{_series(name, labels)} {value}")
+        for (name, labels), value in sorted(snapshot["gauges"].items()):
+            declare(name, "gauge")
+            lines.append(f"{_series(name, labels)} {value}")
+        for (name, labels), (counts, count, total) in sorted(snapshot["histograms"].items()):
+            declare(name, "histogram")
+            buckets = LATENCY_BUCKETS if name.endswith("_seconds") else SIZE_BUCKETS
+            cumulative = 0
+            for bound, n in zip(buckets, counts):
+                cumulative += n
+                le = "+Inf" if math.isinf(bound) else repr(bound)
+                lines.append(f"{_series(name + '_bucket', (*labels, ('le', le)))} {cumulative}")
+            lines.append(f"{_series(name + '_sum', labels)} {total}")
+            lines.append(f"{_series(name + '_count', labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_:]", "_", name)
+
+
+def _series(name: str, labels: tuple) -> str:
+    """name{label="value",...} with label values escaped."""
+    if not labels:
+        return _metric_name(name)
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return _metric_name(name) + "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+metrics = Metrics()
@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+import httpx
+from backend import config
+from backend.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+_lock = threading.RLock()  # reentrant: client factories fetch the shared transport
+_clients = {}
+
+
+# ------------------------------
+# Latency stats per endpoint
+# ------------------------------
+def _endpoint(request: httpx.Request) -> str:
+    return f"{request.url.host}:{request.url.port}{request.url.path}"
+
+
+def _on_request(request: httpx.Request):
+    request.extensions["start_time"] = time.perf_counter()
+
+
+def _on_response(response: httpx.Response):
+    # Time until the response headers arrived (first byte for streamed responses)
+    start = response.request.extensions.get("start_time")
+    endpoint = _endpoint(response.request)
+    if start is not None:
+        metrics.observe("http_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+    metrics.incr("http_requests_total", endpoint=endpoint, status=str(response.status_code))
+
+
+async def _aon_request(request: httpx.Request):
+    _on_request(request)
+
+
+async def _aon_response(response: httpx.Response):
+    _on_response(response)
+
+
+# ------------------------------
+# Shared clients
+# ------------------------------
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_CONNECTIONS,
+        keepalive_expiry=config.HTTP_KEEPALIVE_SECONDS,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(config.LLM_TIMEOUT_SECONDS, connect=config.LLM_CONNECT_TIMEOUT_SECONDS)
+
+
+def _shared(name: str, factory):
+    with _lock:
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+
+def _transport() -> httpx.HTTPTransport:
+    """
+    The one pooled connection set to the Ollama server, shared by the chat LLMs
+    and the native ollama client. It does not retry: the OpenAI SDK retries chat
+    calls and with_retries() native calls, so a failure is retried in one layer only.
+    """
+    return _shared("transport", lambda: httpx.HTTPTransport(limits=_limits()))
+
+
+def get_http_client() -> httpx.Client:
+    """Pooled keep-alive client for the Ollama server."""
+    return _shared("http", lambda: httpx.Client(
+        transport=_transport(),
+        timeout=_timeout(),
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+    ))
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Async twin of get_http_client() for the asyncio chat path (async connections need their own pool)."""
+    return _shared("async_http", lambda: httpx.AsyncClient(
+        transport=httpx.AsyncHTTPTransport(limits=_limits()),
+        timeout=_timeout(),
+        event_hooks={"request": [_aon_request], "response": [_aon_response]},
+    ))
+
+
+def get_chat_llm(temperature: float = 0.7, **kwargs):
+    """
+    ChatOpenAI client for the Ollama OpenAI-compatible endpoint, sharing the pooled
+    HTTP clients. The OpenAI SDK retries failed calls with exponential backoff.
+    :param temperature: sampling temperature
+    :param kwargs: extra ChatOpenAI fields (streaming, tags, ...)
+    """
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        base_url=config.llama_base_url,
+        api_key="ollama",
+        model=config.MODEL,
+        temperature=temperature,
+        max_retries=config.LLM_MAX_RETRIES,
+        timeout=config.LLM_TIMEOUT_SECONDS,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+        **kwargs,
+    )
+
+
+def get_ollama_client():
+    """
+    Native ollama client (document generation, model preload) on the same pooled
+    transport as get_http_client(). Wrap calls in with_retries().
+    """
+    import ollama
+
+    return _shared("ollama", lambda: ollama.Client(
+        host=config.ollama_host,
+        timeout=_timeout(),
+        transport=_transport(),
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+    ))
+
+
+def preload_model(model: str = config.MODEL, keep_alive: str = config.OLLAMA_KEEP_ALIVE):
+    """
+    Ask Ollama to load the model without generating anything (empty prompt),
+    so the first real request does not pay for the cold model load.
+    """
+    return with_retries(get_ollama_client().generate, model=model, prompt="", keep_alive=keep_alive)
+
+
+def with_retries(func, *args, retries: int = config.LLM_MAX_RETRIES, **kwargs):
+    """
+    Call func(*args, **kwargs), retrying transport errors and 5xx responses with
+    exponential backoff (LLM_RETRY_BACKOFF_SECONDS, doubled on every attempt).
+    """
+    import ollama
+
+    for attempt in range(retries + 1):
+        try:
+            return func(*args, **kwargs)
+        except (httpx.TransportError, ollama.ResponseError) as e:
+            retryable = not isinstance(e, ollama.ResponseError) or e.status_code >= 500
+            if not retryable or attempt == retries:
+                raise
+            delay = config.LLM_RETRY_BACKOFF_SECONDS * 2 ** attempt
+            logger.warning("LLM call failed (%s), retrying in %.1fs", e, delay)
+            metrics.incr("llm_retries_total")
+            time.sleep(delay)
+
+
+def latency_stats() -> dict:
+    """p50/p95 latency and request count per Ollama endpoint since startup."""
+    stats = {}
+    for (name, labels), samples in metrics.snapshot()["samples"].items():
+        if name != "http_request_seconds" or not samples:
+            continue
+        ordered = sorted(samples)
+        stats[dict(labels)["endpoint"]] = {
+            "count": len(ordered),
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        }
+    return stats
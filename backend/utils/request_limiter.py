@@ -0,0 +1,62 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from backend import config
+from backend.utils.metrics import metrics
+
+
+class QueueFullError(RuntimeError):
+    """Raised when too many requests are already waiting for the LLM server."""
+
+
+class RequestLimiter:
+    """
+    Bounded semaphore plus waiting queue in front of the Ollama endpoint.
+    At most `max_concurrent` LLM calls run at once; up to `max_queue` more wait
+    for a slot and anything beyond that is rejected right away (backpressure).
+    Queue depth, in-flight calls and wait times are recorded in the metrics registry.
+    """
+
+    def __init__(
+            self,
+            max_concurrent: int = config.LLM_MAX_CONCURRENCY,
+            max_queue: int = config.LLM_MAX_QUEUE,
+            name: str = "ollama",
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.name = name
+        self._semaphore = None  # created on first use, inside the serving event loop
+        self.waiting = 0
+        self.in_flight = 0
+
+    def _update_gauges(self):
+        metrics.set("llm_queue_depth", self.waiting, endpoint=self.name)
+        metrics.set("llm_in_flight", self.in_flight, endpoint=self.name)
+
+    @asynccontextmanager
+    async def slot(self):
+        """async with limiter.slot(): ...  one LLM call"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        if self.waiting >= self.max_queue:
+            metrics.incr("llm_rejected_total", endpoint=self.name)
+            raise QueueFullError(f"{self.waiting} requests already waiting for {self.name}")
+
+        self.waiting += 1
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        metrics.observe("llm_queue_wait_seconds", time.perf_counter() - start, endpoint=self.name)
+
+        self.in_flight += 1
+        self._update_gauges()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self._update_gauges()
@@ -0,0 +1,39 @@
+import threading
+import time
+from contextlib import contextmanager
+from backend.utils.metrics import metrics
+
+_lock = threading.Lock()
+_started = time.perf_counter()
+
+
+@contextmanager
+def startup_stage(name: str):
+    """
+    Time one cold-start stage (import, encoder_load, chroma_open, ...).
+    Stages may run on other threads; repeated stages add up.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            metrics.set("startup_seconds", metrics.gauge("startup_seconds", stage=name) + elapsed, stage=name)
+
+
+def startup_report() -> dict:
+    """Seconds spent per startup stage, plus the wall time since this module was imported."""
+    report = {
+        dict(labels)["stage"]: value
+        for (name, labels), value in metrics.snapshot()["gauges"].items()
+        if name == "startup_seconds"
+    }
+    report["total"] = time.perf_counter() - _started
+    return report
+
+
+def format_startup_report(report: dict = None) -> str:
+    report = report or startup_report()
+    stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in report.items() if stage != "total")
+    return f"Startup took {report['total']:.2f}s ({stages})"
@@ -0,0 +1,188 @@
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORDS = ("the policy requires every employee to report pressure readings before each shift and "
+          "the product team reviews the valve specifications with safety in mind").split()
+
+
+def _reply(prompt: str, n_tokens: int) -> str:
+    """Canned text for the prompts the chatbot sends (intent, condense, summary, answer)."""
+    if "intent classification assistant" in prompt:
+        categories = re.search(r"categories:\s*\n(.*)\n", prompt)
+        question = prompt.rsplit("Question:", 1)[-1].lower()
+        for category in (categories.group(1).split(",") if categories else []):
+            category = category.strip()
+            stem = category[:-3] + "y" if category.endswith("ies") else category.rstrip("s")
+            if category and stem in question:
+                return category
+        return "general"
+    if "Follow Up Input:" in prompt:
+        return prompt.split("Follow Up Input:", 1)[1].split("Standalone question:", 1)[0].strip()
+    return " ".join(_WORDS[i % len(_WORDS)] for i in range(n_tokens))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like Ollama
+    server: "FakeLLMServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: str):
+        payload = data.encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/v1/models", "/api/tags"):
+            model = self.server.model
+            self._json({"object": "list", "data": [{"id": model, "object": "model"}], "models": [{"name": model}]})
+        else:
+            self._json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.rstrip("/") == "/v1/chat/completions":
+            self._chat_completion(request)
+        elif self.path.rstrip("/") == "/api/generate":
+            self._generate(request)
+        else:
+            self._json({"error": "not found"}, status=404)
+
+    def _chat_completion(self, request: dict):
+        prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+        text = _reply(prompt, self.server.answer_tokens)
+        tokens = re.findall(r"\S+\s*", text) or [""]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        base = {"id": completion_id, "created": int(time.time()), "model": request.get("model", self.server.model)}
+        self.server.count()
+
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(tokens),
+                 "total_tokens": len(prompt) // 4 + len(tokens)}
+
+        time.sleep(self.server.first_token_latency)
+        if not request.get("stream"):
+            time.sleep(self.server.token_latency * len(tokens))
+            self._json({
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        # Server-sent events over chunked transfer encoding, as the OpenAI API streams
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self.server.token_latency)
+            delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+        done = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self._write_chunk(f"data: {json.dumps(done)}\n\n")
+        if (request.get("stream_options") or {}).get("include_usage"):
+            # Final usage-only chunk, sent when the client asks for it (stream_usage=True)
+            usage_chunk = {**base, "object": "chat.completion.chunk", "choices": [], "usage": usage}
+            self._write_chunk(f"data: {json.dumps(usage_chunk)}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _generate(self, request: dict):
+        prompt = request.get("prompt", "")
+        self.server.count()
+        # An empty prompt only loads the model (the warm-up ping)
+        text = _reply(prompt, self.server.answer_tokens) if prompt else ""
+        time.sleep(self.server.first_token_latency + self.server.token_latency * len(text.split()))
+        self._json({
+            "model": request.get("model", self.server.model),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "response": text,
+            "done": True,
+            "done_reason": "load" if not prompt else "stop",
+        })
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """
+    Stand-in for Ollama serving its OpenAI-compatible API (/v1/chat/completions,
+    streaming or not) and the native /api/generate, with controllable latency.
+    Answers are canned, so the benchmark measures our pipeline and not a model.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+            self,
+            host: str = "127.0.0.1",
+            port: int = 0,
+            model: str = "llama3.2:latest",
+            first_token_latency: float = 0.2,
+            token_latency: float = 0.02,
+            answer_tokens: int = 120,
+    ):
+        """
+        :param port: 0 picks a free port (see url)
+        :param first_token_latency: seconds before the first token (prompt processing)
+        :param token_latency: seconds between two generated tokens
+        :param answer_tokens: length of a generated answer
+        """
+        super().__init__((host, port), _Handler)
+        self.model = model
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.answer_tokens = answer_tokens
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the stand-in Ollama server")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--first-token-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(port=args.port, first_token_latency=args.first_token_latency,
+                           token_latency=args.token_latency, answer_tokens=args.answer_tokens)
+    print(f"Fake LLM server listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,172 @@
+"""
+Offline end-to-end latency benchmark.
+
+Generates a synthetic corpus, ingests it, and sends questions (first turns and
+follow-ups) through chat_handler.chat() against FakeLLMServer, so no Ollama or
+GPU is needed; only the sentence encoder has to be available locally.
+Reports p50/p95/p99 per stage (intent, condense, retrieval, generation), the
+end-to-end latency, and chunking/ingest throughput as JSON.
+
+    python -m benchmarks.run_benchmark --docs-per-type 200 --questions 50 \
+        --output benchmarks/results/$(date +%Y%m%d-%H%M).json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from backend import config
+from benchmarks.fake_llm_server import FakeLLMServer
+from benchmarks.synthetic_corpus import generate_corpus, sample_questions
+
+STAGES = ("intent", "condense", "retrieval", "generation")
+
+
+def percentiles(samples: list) -> dict:
+    """count, mean, p50, p95 and p99 of a list of observations."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+    }
+
+
+def configure(workdir: Path, server_url: str, answer_cache: bool, vector_backend: str = config.VECTOR_BACKEND):
+    """
+    Point every path and the LLM endpoint at the benchmark sandbox.
+    Must run before the RAG modules are imported (their defaults bind config values).
+    """
+    config.doc_path = workdir / "generated_docs"
+    config.db_folder = workdir / "vector_db"
+    config.db_version_file = workdir / "vector_db.version"
+    config.bm25_file = workdir / "vector_db.bm25.pkl"
+    config.manifest_file = workdir / "vector_db.manifest.json"
+    config.catalog_file = workdir / "vector_db.catalog.json"
+    config.embedding_cache_dir = workdir / "embedding_cache"
+    config.VECTOR_BACKEND = vector_backend
+    config.ollama_host = server_url
+    config.llama_base_url = f"{server_url}/v1"
+    if not answer_cache:
+        config.ANSWER_CACHE_MAX_ENTRIES = 0
+
+
+def bench_chunking() -> dict:
+    from backend.RAG_helper.doc_chunking import Chunker
+
+    chunker = Chunker()
+    n_files = len(chunker.list_files())
+    start = time.perf_counter()
+    chunks = chunker.chunk()
+    seconds = time.perf_counter() - start
+    return {
+        "documents": n_files,
+        "chunks": len(chunks),
+        "seconds": seconds,
+        "documents_per_second": n_files / seconds if seconds else 0.0,
+        "chunks_per_second": len(chunks) / seconds if seconds else 0.0,
+    }
+
+
+def bench_ingest() -> dict:
+    from backend.RAG_helper.embedding import VectorEmbedding
+
+    embedding = VectorEmbedding()
+    start = time.perf_counter()
+    embedding.create_vector()
+    return {**embedding.pipeline.stats, "wall_seconds": time.perf_counter() - start}
+
+
+def bench_chat(questions: list, follow_ups: bool) -> dict:
+    from backend import chat_handler
+    from backend.utils.metrics import metrics
+
+    start = time.perf_counter()
+    chat_handler.get_chatbot_components()
+    init_seconds = time.perf_counter() - start
+    metrics.reset()  # only count the requests below
+
+    end_to_end, first_update = [], []
+    for question, follow_up in questions:
+        history = []
+        for message in (question, follow_up) if follow_ups else (question,):
+            request_start = time.perf_counter()
+            answer, first = "", None
+            for answer in chat_handler.chat(message, history):
+                first = first or time.perf_counter() - request_start
+            end_to_end.append(time.perf_counter() - request_start)
+            first_update.append(first)
+            history = history + [{"role": "user", "content": message}, {"role": "assistant", "content": answer}]
+
+    return {
+        "init_seconds": init_seconds,
+        "requests": len(end_to_end),
+        "stages": {stage: percentiles(metrics.samples("stage_seconds", stage=stage)) for stage in STAGES},
+        "end_to_end": percentiles(end_to_end),
+        "first_update": percentiles([s for s in first_update if s is not None]),
+        "time_to_first_token": percentiles(metrics.samples("time_to_first_token_seconds")),
+        "llm_calls_per_message": percentiles(metrics.samples("llm_calls_per_message")),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs-per-type", type=int, default=50, help="synthetic documents per doc_type")
+    parser.add_argument("--paragraphs", type=int, default=6, help="paragraphs per synthetic document")
+    parser.add_argument("--questions", type=int, default=30, help="conversations to run")
+    parser.add_argument("--no-follow-ups", action="store_true", help="only send first-turn questions")
+    parser.add_argument("--answer-cache", action="store_true", help="keep the semantic answer cache enabled")
+    parser.add_argument("--first-token-latency", type=float, default=0.2, help="fake LLM seconds to first token")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="fake LLM seconds per token")
+    parser.add_argument("--answer-tokens", type=int, default=120, help="fake LLM answer length")
+    parser.add_argument("--vector-backend", choices=["chroma", "numpy"], default=config.VECTOR_BACKEND)
+    parser.add_argument("--workdir", type=Path, help="sandbox folder (default: a temporary directory)")
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/results/latest.json"))
+    args = parser.parse_args()
+
+    server = FakeLLMServer(first_token_latency=args.first_token_latency, token_latency=args.token_latency,
+                           answer_tokens=args.answer_tokens).start()
+    with tempfile.TemporaryDirectory(prefix="askrag-bench-") as tmp:
+        workdir = args.workdir or Path(tmp)
+        configure(workdir, server.url, args.answer_cache, args.vector_backend)
+        n_docs = generate_corpus(config.doc_path, args.docs_per_type, args.paragraphs)
+        print(f"Generated {n_docs} synthetic documents in {config.doc_path}")
+
+        results = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "parameters": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "chunking": bench_chunking(),
+            "ingest": bench_ingest(),
+            "chat": bench_chat(sample_questions(args.questions), follow_ups=not args.no_follow_ups),
+            "llm_requests": server.requests,
+        }
+    server.stop()
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(json.dumps({"stages": results["chat"]["stages"], "end_to_end": results["chat"]["end_to_end"]}, indent=2))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
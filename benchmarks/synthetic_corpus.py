@@ -0,0 +1,75 @@
+import random
+from pathlib import Path
+
+# Vocabulary per doc_type, so the categories are separable like the generated documents
+VOCABULARY = {
+    "employees": ("engineer manager department hire date salary team lead training certification "
+                  "supervisor field operations shift skills performance review contact email").split(),
+    "policies": ("policy compliance safety procedure requirement employee must report incident "
+                 "approval leave travel expense security audit violation regulation").split(),
+    "products": ("pump valve sensor pressure flow rate specification drilling tool wellhead "
+                 "maintenance installation warranty model rating temperature").split(),
+}
+COMMON = "the a of and to for in with on by is are be this that each all".split()
+HEADER = """---
+Company: Oilwell Corporation
+Document Number: OW-DOC-{doc_number}
+Date: 2025-10-07
+Classification: Internal Use Only
+---
+
+"""
+
+
+def _sentence(rng: random.Random, words: list) -> str:
+    sentence = [rng.choice(words if rng.random() < 0.5 else COMMON) for _ in range(rng.randint(8, 18))]
+    return " ".join(sentence).capitalize() + "."
+
+
+def generate_corpus(
+        output_dir: Path,
+        docs_per_type: int = 50,
+        paragraphs: int = 6,
+        doc_types: tuple = tuple(VOCABULARY),
+        seed: int = 0,
+) -> int:
+    """
+    Write synthetic markdown documents in the generated_docs/<doc_type>/ layout.
+    :param output_dir: root folder (what config.doc_path points to)
+    :param docs_per_type: documents per doc_type folder
+    :param paragraphs: paragraphs per document (about 5 sentences each)
+    :return: number of documents written
+    """
+    rng = random.Random(seed)
+    output_dir = Path(output_dir)
+    doc_number = 1000
+    for doc_type in doc_types:
+        words = VOCABULARY.get(doc_type, COMMON)
+        folder = output_dir / doc_type
+        folder.mkdir(parents=True, exist_ok=True)
+        for i in range(docs_per_type):
+            doc_number += 1
+            sections = [f"# {doc_type.title()} document {i + 1}"]
+            for p in range(paragraphs):
+                sections.append(f"## Section {p + 1}\n" + " ".join(_sentence(rng, words) for _ in range(5)))
+            (folder / f"{doc_type}_{i + 1:05d}.md").write_text(
+                HEADER.format(doc_number=doc_number) + "\n\n".join(sections) + "\n", encoding="utf-8"
+            )
+    return docs_per_type * len(doc_types)
+
+
+def sample_questions(n: int, doc_types: tuple = tuple(VOCABULARY), seed: int = 0) -> list:
+    """
+    Questions about the synthetic corpus.
+    :return: list of (question, follow-up question) pairs; the follow-up refers back to the first
+    """
+    rng = random.Random(seed)
+    questions = []
+    for i in range(n):
+        words = VOCABULARY.get(doc_types[i % len(doc_types)], COMMON)
+        first, second = rng.sample(words, 2)
+        questions.append((
+            f"What does the documentation say about {first} and {second}?",
+            f"What is the {rng.choice(words)} for it?",
+        ))
+    return questions
@@ -0,0 +1,182 @@
+"""
+Vector store backend benchmark: Chroma against the memory-mapped NumpyVectorStore
+(float16 and int8) on the same synthetic, doc_type-clustered embeddings.
+
+Every backend is built and then queried in fresh subprocesses, so load time and
+resident memory are not skewed by the other backends. Reports insert time, size
+on disk, load time, RSS after load and after querying, query latency with and
+without a doc_type filter, and recall@k against an exact float32 search, as JSON.
+
+    python -m benchmarks.vector_store_benchmark --vectors 100000 --dim 384 \
+        --output benchmarks/results/vector_store.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from benchmarks.run_benchmark import git_commit, percentiles
+
+BACKENDS = ("chroma", "numpy-float16", "numpy-int8")
+CHROMA_BATCH = 5000  # below Chroma's maximum batch size
+
+
+def generate_vectors(n: int, dim: int, n_types: int, n_queries: int, seed: int = 0) -> dict:
+    """Normalized vectors clustered around one center per doc_type, plus queries drawn near them."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_types, dim)).astype(np.float32)
+    codes = rng.integers(0, n_types, size=n)
+    vectors = centers[codes] + rng.normal(scale=1.5, size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picked = rng.choice(n, size=n_queries, replace=False)
+    queries = vectors[picked] + rng.normal(scale=0.05, size=(n_queries, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return {"vectors": vectors, "codes": codes, "queries": queries, "query_codes": codes[picked]}
+
+
+def exact_neighbours(data: dict, k: int) -> tuple:
+    """float32 brute-force top-k IDs per query, unfiltered and filtered on the query's doc_type."""
+    scores = data["queries"] @ data["vectors"].T
+    unfiltered = np.argsort(-scores, axis=1)[:, :k]
+    masked = np.where(data["codes"][None, :] == data["query_codes"][:, None], scores, -np.inf)
+    filtered = np.argsort(-masked, axis=1)[:, :k]
+    return unfiltered, filtered
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux), else the peak reported by getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def folder_mb(folder: Path) -> float:
+    return sum(f.stat().st_size for f in Path(folder).rglob("*") if f.is_file()) / 2 ** 20
+
+
+def open_store(backend: str, folder: Path):
+    if backend == "chroma":
+        from langchain_chroma import Chroma
+
+        return Chroma(persist_directory=str(folder))
+    from backend.RAG_helper.numpy_store import NumpyVectorStore
+
+    return NumpyVectorStore(str(folder), dtype=backend.split("-", 1)[1])
+
+
+def build(backend: str, workdir: Path) -> dict:
+    """Insert the generated vectors (same call the ingest pipeline makes: _collection.upsert)."""
+    with np.load(workdir / "data.npz") as data:
+        vectors, codes = data["vectors"], data["codes"]
+    folder = workdir / backend
+    store = open_store(backend, folder)
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), CHROMA_BATCH):
+        rows = range(offset, min(offset + CHROMA_BATCH, len(vectors)))
+        store._collection.upsert(
+            ids=[f"chunk-{i}" for i in rows],
+            embeddings=vectors[offset:rows.stop],
+            documents=[f"synthetic chunk {i}" for i in rows],
+            metadatas=[{"doc_type": f"type{codes[i]}", "source": f"doc{i // 20}.md"} for i in rows],
+        )
+    return {"insert_seconds": time.perf_counter() - start, "disk_mb": folder_mb(folder)}
+
+
+def query(backend: str, workdir: Path, k: int) -> dict:
+    """Open the built store cold, then time filtered and unfiltered searches (what QueryPipeline calls)."""
+    with np.load(workdir / "data.npz") as data:
+        queries, query_codes = data["queries"], data["query_codes"]
+        expected = {"unfiltered": data["exact_unfiltered"], "filtered": data["exact_filtered"]}
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    store = open_store(backend, workdir / backend)
+    store._collection.count()
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_mb()
+
+    results = {"load_seconds": load_seconds, "rss_load_mb": rss_loaded - rss_before}
+    for mode in ("unfiltered", "filtered"):
+        latencies, hits = [], 0
+        for vector, code, truth in zip(queries, query_codes, expected[mode]):
+            search_filter = {"doc_type": f"type{code}"} if mode == "filtered" else None
+            start = time.perf_counter()
+            docs = store.similarity_search_by_vector(vector.tolist(), k=k, filter=search_filter)
+            latencies.append(time.perf_counter() - start)
+            found = {int(doc.id.split("-")[1]) if doc.id else -1 for doc in docs}
+            hits += len(found & set(truth.tolist()))
+        results[mode] = {"latency_seconds": percentiles(latencies), f"recall@{k}": hits / truth.size / len(queries)}
+    results["rss_query_mb"] = rss_mb() - rss_before
+    return results
+
+
+def run_worker(phase: str, backend: str, workdir: Path, k: int) -> dict:
+    """Run one phase in a fresh interpreter and return its JSON result (or the error)."""
+    command = [sys.executable, "-m", "benchmarks.vector_store_benchmark", "--worker", phase,
+               "--backend", backend, "--workdir", str(workdir), "--k", str(k)]
+    process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode:
+        return {"error": (process.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50000, help="stored vectors")
+    parser.add_argument("--dim", type=int, default=384, help="embedding dimension (all-MiniLM-L6-v2: 384)")
+    parser.add_argument("--doc-types", type=int, default=3, help="doc_type clusters")
+    parser.add_argument("--queries", type=int, default=200, help="queries per mode")
+    parser.add_argument("--k", type=int, default=10, help="neighbours per query")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--workdir", type=Path, help="sandbox folder (default: a temporary directory)")
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/results/vector_store.json"))
+    parser.add_argument("--worker", choices=["build", "query"], help=argparse.SUPPRESS)
+    parser.add_argument("--backend", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        if args.worker == "build":
+            print(json.dumps(build(args.backend, args.workdir)))
+        else:
+            print(json.dumps(query(args.backend, args.workdir, args.k)))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="askrag-vector-bench-") as tmp:
+        workdir = args.workdir or Path(tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        data = generate_vectors(args.vectors, args.dim, args.doc_types, args.queries)
+        exact_unfiltered, exact_filtered = exact_neighbours(data, args.k)
+        np.savez(workdir / "data.npz", **data, exact_unfiltered=exact_unfiltered, exact_filtered=exact_filtered)
+        print(f"Generated {args.vectors} x {args.dim} vectors "
+              f"({data['vectors'].nbytes / 2 ** 20:.0f} MB as float32) in {workdir}")
+
+        backends = {}
+        for backend in args.backends:
+            result = run_worker("build", backend, workdir, args.k)
+            if "error" not in result:
+                result.update(run_worker("query", backend, workdir, args.k))
+            backends[backend] = result
+            print(f"{backend}: {json.dumps(result)}")
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "parameters": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()
+                       if k not in ("worker", "backend")},
+        "backends": backends,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
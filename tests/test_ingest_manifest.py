@@ -0,0 +1,27 @@
+from backend.RAG_helper.ingest_manifest import chunk_ids, stale_chunk_ids
+
+
+def entry(rel_path: str, content_hash: str, doc_type: str, count: int = 3) -> dict:
+    return {"hash": content_hash, "doc_type": doc_type, "chunk_ids": chunk_ids(rel_path, content_hash, count)}
+
+
+def test_doc_type_change_keeps_rewritten_chunks():
+    # Same content, only the stored doc_type differs (e.g. "Policies" -> "policies"):
+    # the file is re-ingested under the same IDs, none of which may be deleted
+    previous = {"policies/a.md": entry("policies/a.md", "h1" * 32, "Policies")}
+    current = {"policies/a.md": entry("policies/a.md", "h1" * 32, "policies")}
+    assert stale_chunk_ids(previous, current) == []
+
+
+def test_modified_and_removed_files_are_stale():
+    previous = {
+        "policies/a.md": entry("policies/a.md", "h1" * 32, "policies"),
+        "policies/b.md": entry("policies/b.md", "h2" * 32, "policies"),
+        "products/c.md": entry("products/c.md", "h3" * 32, "products"),
+    }
+    current = {
+        "policies/a.md": previous["policies/a.md"],  # unchanged
+        "policies/b.md": entry("policies/b.md", "h4" * 32, "policies", count=2),  # modified
+    }  # products/c.md removed
+    expected = previous["policies/b.md"]["chunk_ids"] + previous["products/c.md"]["chunk_ids"]
+    assert sorted(stale_chunk_ids(previous, current)) == sorted(expected)
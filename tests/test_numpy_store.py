@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+from backend.RAG_helper.numpy_store import NumpyIndex, NumpyVectorStore
+
+DIM = 16
+
+
+def make_vectors(n: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def fill(store: NumpyVectorStore, vectors: np.ndarray, offset: int = 0):
+    ids = [f"chunk-{offset + i}" for i in range(len(vectors))]
+    store._collection.upsert(
+        ids=ids,
+        embeddings=vectors,
+        documents=[f"text {offset + i}" for i in range(len(vectors))],
+        metadatas=[{"doc_type": "even" if (offset + i) % 2 == 0 else "odd", "source": f"doc{offset + i}.md"}
+                   for i in range(len(vectors))],
+    )
+    return ids
+
+
+@pytest.fixture(params=["float16", "int8"])
+def dtype(request):
+    return request.param
+
+
+def test_upsert_count_and_replace(tmp_path, dtype):
+    store = NumpyVectorStore(str(tmp_path), dtype=dtype)
+    vectors = make_vectors(10)
+    ids = fill(store, vectors)
+    assert store._collection.count() == 10
+
+    # Same IDs again: rows are replaced, not appended
+    store._collection.upsert(ids=ids[:3], embeddings=vectors[:3], documents=["new"] * 3,
+                             metadatas=[{"doc_type": "odd"}] * 3)
+    assert store._collection.count() == 10
+    assert store._collection.get(ids=ids[:3])["documents"] == ["new"] * 3
+
+
+def test_duplicate_ids_in_one_batch(tmp_path, dtype):
+    store = NumpyVectorStore(str(tmp_path), dtype=dtype)
+    vectors = make_vectors(3)
+    store._collection.upsert(ids=["a", "a", "b"], embeddings=vectors, documents=["first", "second", "b"],
+                             metadatas=[{"doc_type": "odd"}] * 3)
+    assert store._collection.count() == 2
+    assert store._collection.get(ids=["a"])["documents"] == ["second"]  # the last copy wins
+    assert len(store.similarity_search_by_vector(vectors[1].tolist(), k=3)) == 2
+
+
+def test_delete_reuses_rows(tmp_path, dtype):
+    store = NumpyVectorStore(str(tmp_path), dtype=dtype)
+    ids = fill(store, make_vectors(10))
+    store.delete(ids=ids[:4])
+    assert store._collection.count() == 6
+    assert store._collection.get(ids=ids[:4])["ids"] == []
+
+    fill(store, make_vectors(4, seed=1), offset=100)
+    assert store._collection.count() == 10
+    assert store._index.n_rows == 10  # freed rows were reused instead of growing the matrix
+
+
+def test_grow_and_reopen(tmp_path, dtype):
+    vectors = make_vectors(1500)
+    store = NumpyVectorStore(str(tmp_path), dtype=dtype)
+    fill(store, vectors[:1000])
+    fill(store, vectors[1000:], offset=1000)  # past the initial capacity of 1024 rows
+    assert store._index.capacity >= 1500
+
+    reopened = NumpyVectorStore(str(tmp_path), dtype="float16")  # an existing index keeps its dtype
+    assert reopened._index.dtype == dtype
+    assert reopened._collection.count() == 1500
+    top = reopened.similarity_search_by_vector(vectors[1234].tolist(), k=1)
+    assert top[0].id == "chunk-1234"
+
+
+def test_filtered_top_k_matches_exact_search(tmp_path, dtype):
+    vectors = make_vectors(300)
+    store = NumpyVectorStore(str(tmp_path), dtype=dtype)
+    fill(store, vectors)
+    query = make_vectors(1, seed=2)[0]
+
+    docs = store.similarity_search_by_vector(query.tolist(), k=5, filter={"doc_type": "odd"})
+    assert len(docs) == 5
+    assert all(doc.metadata["doc_type"] == "odd" for doc in docs)
+
+    scores = vectors @ query
+    scores[::2] = -np.inf  # even rows are filtered out
+    expected = {f"chunk-{i}" for i in np.argsort(-scores)[:5]}
+    found = {doc.id for doc in docs}
+    # int8 quantization may swap near-ties at the cut-off
+    assert len(found & expected) >= (4 if dtype == "int8" else 5)
+
+    assert store.similarity_search_by_vector(query.tolist(), k=5, filter={"doc_type": "missing"}) == []
+    with pytest.raises(ValueError):
+        store.similarity_search_by_vector(query.tolist(), k=5, filter={"source": "doc1.md"})
+
+
+def test_get_embeddings_and_where(tmp_path, dtype):
+    vectors = make_vectors(20)
+    store = NumpyVectorStore(str(tmp_path), dtype=dtype)
+    ids = fill(store, vectors)
+
+    output = store._collection.get(ids=[ids[7], ids[3]], include=["embeddings"])
+    assert output["ids"] == [ids[3], ids[7]]  # row order, like a scan
+    assert output["documents"] is None and output["metadatas"] is None
+    np.testing.assert_allclose(output["embeddings"], vectors[[3, 7]], atol=0.02 if dtype == "int8" else 1e-3)
+
+    odd = store._collection.get(where={"doc_type": "odd"}, include=[])
+    assert odd["ids"] == ids[1::2]
+    assert store._collection.get(where={"doc_type": "odd", "source": "doc3.md"})["ids"] == [ids[3]]
+    assert store._collection.get(limit=5, offset=18)["ids"] == ids[18:]
+
+
+def test_refresh_sees_writes_of_another_instance(tmp_path):
+    reader = NumpyIndex(tmp_path)
+    writer = NumpyIndex(tmp_path)
+    vectors = make_vectors(5)
+    writer.upsert([f"chunk-{i}" for i in range(5)], vectors, metadatas=[{"doc_type": "odd"}] * 5)
+
+    rows, _ = reader.search(vectors[2], k=1)  # search() picks up the new index.json
+    assert reader.count() == 5
+    assert reader.records(rows[0])[0][1] == "chunk-2"